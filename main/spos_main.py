@@ -252,6 +252,8 @@ class Ui(QtWidgets.QMainWindow, object):
 
         self.correction_window = Data_corrector(self.wavelength)                                        # Load the class for further data correction and interpretation,
         self.correction_window.settings()                                                               # as described in 'data_correction.py'
+        self.correction_window.correction_finished.connect(self.on_data_correction_done)
+        self.correction_window.correction_failed.connect(self.on_data_correction_failed)
 
         self.btn_save.setEnabled(False)                                                                 # Disable buttons at the beginning
         self.btn_pause.setEnabled(False)
@@ -720,8 +722,17 @@ class Ui(QtWidgets.QMainWindow, object):
         self.ref_index_Re, self.ref_index_Im = 0, 0
         self.diameters_Cext, self.Cext_polystirene, self.selected_Cext, self.poly_fit = np.zeros(len(self.sizes)), np.zeros(len(self.sizes)), np.zeros(len(self.sizes)), np.poly1d(1)
         
-        if self.correction_window.ref_index_correction_label==True: 
-            self.sizes_RI_cal, self.ref_index_Re, self.ref_index_Im, self.diameters_Cext, self.Cext_polystirene, self.selected_Cext, self.poly_fit = self.correction_window.refractive_index_calibration_correction(self.sizes)
+        if self.correction_window.ref_index_correction_label==True: self.correction_window.start_refractive_index_correction(self.sizes)  # Results are shown when the
+        else: self.on_data_correction_done(None)                                                        # worker thread is done
+
+
+    # -----------------------------------------------------------------------------------------------------------------------------------------------------#
+    #
+
+    def on_data_correction_done(self, results):
+
+        if results is not None: 
+            self.sizes_RI_cal, self.ref_index_Re, self.ref_index_Im, self.diameters_Cext, self.Cext_polystirene, self.selected_Cext, self.poly_fit = results
         
         if self.correction_window.aspect_ratio_correction_label==True: self.sizes_ar_cal = self.correction_window.aspect_ratio_calibration_correction(self.sizes)
 
@@ -734,6 +745,14 @@ class Ui(QtWidgets.QMainWindow, object):
         self.correction_plot = CData_Plotter(self.x_data, self.h1[:-1], self.time_data, self.data1, self.ref_index_Re, self.ref_index_Im, self.diameters_Cext, self.Cext_polystirene, self.selected_Cext, self.poly_fit, f"{self.lineEdit_save_path.text()}/{self.time_str[:-12]}/", self.lineEdit_save_name.text(), self.correction_labels)
         self.correction_plot.show()
 
+
+    # -----------------------------------------------------------------------------------------------------------------------------------------------------#
+    #
+
+    def on_data_correction_failed(self, message):
+
+        self.output_err.append(datetime.now().strftime("%d-%m-%Y_%H:%M:%S.%f")[11:-7]+'\t ERROR: refractive index correction failed ('+message+').')
+
     
     # -----------------------------------------------------------------------------------------------------------------------------------------------------#
     #
@@ -841,6 +860,9 @@ class Ui(QtWidgets.QMainWindow, object):
         self.curve_time2_avg.setData(np.linspace(0, self.data1.shape[0]-1, self.data1.shape[0]), np.mean(self.time_data)*np.ones(self.data1.shape[0]))
         self.curve_volt.setData(np.linspace(0, self.data1.shape[0]-1, self.data1.shape[0]), self.volt1)
         self.curve_ram.setData(np.linspace(0, self.data1.shape[0]-1, self.data1.shape[0]), self.RAM1)
+        self.time1_plt.autoRange()                                                                      # Auto-range is disabled on these plots: the ranges are
+        self.time2_plt.autoRange()                                                                      # fitted to the data only once
+        self.volt_plt.autoRange()
 
         legend_single_d = pg.LegendItem((0,0), offset=(910,35))
         legend_single_d.setParentItem(self.single_d_plt.graphicsItem())
@@ -932,9 +954,11 @@ class Ui(QtWidgets.QMainWindow, object):
         self.single_d_and_time_win, self.single_d_plt, self.curve_single_d, self.time1_plt, self.curve_time1 = self.first_panel.single_d_and_time_liveplot('b', 'r', 4, QtCore.Qt.SolidLine)
         self.incremental_d_and_time_win, self.incremental_d_plt, self.curve_incremental_d, self.time2_plt, self.curve_time2 = self.second_panel.incremental_d_and_time_liveplot('b', 'r', 4, QtCore.Qt.SolidLine)
         self.volt_win, self.volt_plt, self.curve_volt, self.curve_ram = self.third_panel.volt_liveplot('b', 'r', 4, QtCore.Qt.SolidLine)
+        for curve in (self.curve_volt, self.curve_ram): curve.set_downsampled(self.volt_win.width())            # ~ one bin per pixel
 
         self.time1_plt.setYRange(0, 700)
         self.time2_plt.setYRange(0, 700)
+        self.volt_plt.setYRange(0, 8000, padding=0)                                                     # Same framing as set by the voltage panel
 
         self.flow_rate = (10**11)*self.flow_rate/6
         self.volume = self.flow_rate*self.repetition_time
@@ -1015,10 +1039,13 @@ class Ui(QtWidgets.QMainWindow, object):
 
             self.curve_single_d.setData(self.channels[1][1:-1], (self.incremental_data - self.data_bkp)[1:-1], stepMode='right')
             self.curve_incremental_d.setData(self.channels[1][1:-1], self.incremental_data[1:-1], stepMode='right')
-            self.curve_time1.setData(np.linspace(0, len(self.time_data), len(self.time_data)+1)[:-1], np.array(self.time_data), stepMode='left')
-            self.curve_time2.setData(np.linspace(0, len(self.time_data), len(self.time_data)+1)[:-1], np.array(self.time_data), stepMode='left')
-            self.curve_volt.setData(np.linspace(0, len(self.time_volt), len(self.time_volt)+1)[:-1], np.array(self.time_volt))
-            self.curve_ram.setData(np.linspace(0, len(self.time_ram), len(self.time_ram)+1)[:-1], np.array(self.time_ram))
+            self.curve_time1.append(np.arange(len(self.curve_time1), len(self.time_data)), self.time_data[len(self.curve_time1):], stepMode='left')     # Only the new samples
+            self.curve_time2.append(np.arange(len(self.curve_time2), len(self.time_data)), self.time_data[len(self.curve_time2):], stepMode='left')     # are added to the curves
+            self.curve_volt.append(len(self.time_volt)-1, self.volt)
+            self.curve_ram.append(len(self.time_ram)-1, self.buffer)
+            self.time1_plt.setXRange(0, len(self.time_data), padding=0)                                 # Time ranges follow the number of samples, without
+            self.time2_plt.setXRange(0, len(self.time_data), padding=0)                                 # scanning the curves bounds
+            self.volt_plt.setXRange(0, len(self.time_volt), padding=0)
 
             legend_single_d = pg.LegendItem((0,0), offset=(910,35))
             legend_single_d.setParentItem(self.single_d_plt.graphicsItem())
@@ -1026,7 +1053,7 @@ class Ui(QtWidgets.QMainWindow, object):
 
             legend_time1 = pg.LegendItem((0,0), offset=(910,35))
             legend_time1.setParentItem(self.time1_plt.graphicsItem())
-            legend_time1.addItem(self.curve_time1, '# counts')
+            legend_time1.addItem(self.curve_time1.item, '# counts')
 
             legend_incremental_d = pg.LegendItem((0,0), offset=(910,35))
             legend_incremental_d.setParentItem(self.incremental_d_plt.graphicsItem())
@@ -1034,12 +1061,12 @@ class Ui(QtWidgets.QMainWindow, object):
 
             legend_time2 = pg.LegendItem((0,0), offset=(910,35))
             legend_time2.setParentItem(self.time2_plt.graphicsItem())
-            legend_time2.addItem(self.curve_time2, '# counts')
+            legend_time2.addItem(self.curve_time2.item, '# counts')
             
             legend_volt = pg.LegendItem((0,0), offset=(820,300))
             legend_volt.setParentItem(self.volt_plt.graphicsItem())
-            legend_volt.addItem(self.curve_volt, 'LASER diode voltage')
-            legend_volt.addItem(self.curve_ram, 'RAM-buffer voltage')
+            legend_volt.addItem(self.curve_volt.item, 'LASER diode voltage')
+            legend_volt.addItem(self.curve_ram.item, 'RAM-buffer voltage')
 
             if self.print_on_terminal==True: print('\n\n\n\n', self.index, '\t', self.volt, '\t', self.buffer, '\t', (self.end_time-self.init_time).total_seconds(), '\t',  self.meas_data, '\n')
             if self.print_on_terminal==True: print(self.counts_sum) 
@@ -19,10 +19,14 @@
 ############################################################################################################################################################
 
 
-import numpy as np, math as m, matplotlib.pyplot as plt, os                               # Import the required libraries
+import numpy as np, math as m, matplotlib.pyplot as plt                                   # Import the required libraries
 from scipy.interpolate import interp1d
 from scipy.optimize import curve_fit
 from scipy.ndimage import uniform_filter1d
+from matplotlib.collections import LineCollection
+from pathlib import Path
+
+_PATH = Path(__file__).resolve().parents[1]                                                 # DEDALO root directory
 
 
 ############################################################################################################################################################
@@ -31,99 +35,141 @@ from scipy.ndimage import uniform_filter1d
 
 def f(x, *p): return np.poly1d(p)(x)
 
+def jac(x, *p): return np.vander(x, len(p))                                                 # Analytic Jacobian of the polynomial model (Vandermonde matrix)
+
 
 ############################################################################################################################################################
 
 
-wavelength = 0.670
-ref_index_Re = 1.58                                                                          # Set the refractive index real and imaginary part 
-ref_index_Im = 0
-n_med = 1.3310
 sizes = np.array([1.0, 1.3, 1.6, 1.9, 2.2, 2.5, 2.8, 3.1, 3.4, 3.7, 4.0, 4.3, 4.6, 4.9, 5.2, 5.5, 5.8, 6.1, 6.4, 6.7, 7.0, 7.3, 7.6, 7.9, 8.2, 8.5, 8.8, 9.1, 9.4, 9.7, 10.0, 10.3])
-h = 0
 
-if ref_index_Im != 0: file = open('../LUT_Cext/LUT_Cext_l='+'{:.02f}'.format(wavelength)+'um_nmed='+'{:.04f}'.format(n_med)+'_m=[1.0001+'+'{:.04f}'.format(ref_index_Im)+'j-1.9534+'+'{:.04f}'.format(ref_index_Im)+'j].txt', 'r')
-else: file = open('../LUT_Cext/LUT_Cext_l='+'{:.02f}'.format(wavelength)+'um_nmed='+'{:.04f}'.format(n_med)+'_m=[1.0001-1.9534].txt', 'r')
+n_range = np.array([1.42, 1.46, 1.47, 1.48, 1.50, 1.51, 1.52, 1.53, 1.56, 1.58, 1.64])             # Smoothing window size as a function of the refractive index
+s_range = np.array([100, 125, 150, 150, 150, 150, 150, 125, 125, 100, 100])
 
-m_polystirene = np.round(ref_index_Re/n_med, 4)                                                           # Polystirene relative refractive index, rounded to the 4th decimal value
+true_pos = np.array([1.0, 1.8, 2.9, 3.7, 5, 10])                                                    # Expected and measured diameters of the calibrated polystyrene spheres
+false_pos = np.array([1.05, 2.5, 3.7, 4.1, 5.8, 10])
+false_pos_dev = np.array([0.1, 0.3, 0.2, 0.3, 0.3, 0.2])
+false_pos_lower, false_pos_upper = false_pos-1.2*false_pos_dev, false_pos+1.2*false_pos_dev
+sigma = np.array([0.01, 0.01, 0.01, 0.01, 0.01, 0.01])
 
-m = m_polystirene                                                                 # Relative refractive index, rounded to the 4th decimal value
 
-diameters_Cext, m_Cext, lines_Cext, Cext = [], [], file.readlines(), []                             # The first row is taken apart since it contains
-diameters_Cext.append(np.array([float(i) for i in lines_Cext[0].split('\t')[2:] if i.strip()]))     # the particle diameters; the other ones are converted to float and 
-diameters_Cext = diameters_Cext[0]                                                                  # appended to the corresponding list
-for x in lines_Cext[1:]: 
-    Cext.append(np.array([complex(i) for i in x.split('\t') if i.strip()]))
-    h += 1
+############################################################################################################################################################
+# Compute the instrumental calibration curve from the extinction cross-section LUT for the given laser wavelength, medium and particle refractive index.
+# Returns the diameters axis and the calibration curve restricted to the plotted range, together with the interpolating functions used for plotting.
 
-for j in range(0, len(Cext)): 
-    m_Cext.append(Cext[j][0])
-    Cext[j] = np.real(Cext[j][1:])
+def build_calibration_curve(wavelength, n_med, ref_index_Re, ref_index_Im):
 
-diameters_idx = []
-for i in range(0, len(sizes)): diameters_idx.append(np.where(diameters_Cext==round(sizes[i], 2))[0][0])
+    h = 0
 
-polystirene_idx = np.where(np.real(m_Cext)==m_polystirene.real)[0]                                  # Find when the row corresponding to polystirene refractive index 
-Cext_polystirene = Cext[polystirene_idx[0]]
-_Cext_polystirene = uniform_filter1d(Cext_polystirene, size=150)
-Cext_polystirene_cfr = _Cext_polystirene[diameters_idx]
+    if ref_index_Im != 0: file = open(_PATH / 'LUT_Cext' / ('LUT_Cext_l='+'{:.02f}'.format(wavelength)+'um_nmed='+'{:.04f}'.format(n_med)+'_m=[1.0001+'+'{:.04f}'.format(ref_index_Im)+'j-1.9534+'+'{:.04f}'.format(ref_index_Im)+'j].txt'), 'r')
+    else: file = open(_PATH / 'LUT_Cext' / ('LUT_Cext_l='+'{:.02f}'.format(wavelength)+'um_nmed='+'{:.04f}'.format(n_med)+'_m=[1.0001-1.9534].txt'), 'r')
 
-idx = np.where(np.real(m_Cext)==m.real)[0]                                                          # Find when the experimental refractive index is equal to some 
-if len(idx) > 1:                                                                                    # value ammong the LUT ones
-    selected_Cext = 0                                                                               # If more than one is found, the average Cext is computed
-    for i in range(0, len(idx)): selected_Cext += Cext[idx[i]]  
-    selected_Cext = selected_Cext/len(idx)
-else: 
-    selected_Cext = Cext[idx[0]]
-idx = 0
+    m_polystirene = np.round(ref_index_Re/n_med, 4)                                                 # Polystirene relative refractive index, rounded to the 4th decimal value
 
-n_range = np.array([1.42, 1.46, 1.47, 1.48, 1.50, 1.51, 1.52, 1.53, 1.56, 1.58, 1.64])
-s_range = np.array([100, 125, 150, 150, 150, 150, 150, 125, 125, 100, 100])
-poly_coefficients = np.polyfit(n_range, s_range, 3)
-_poly_fit = np.poly1d(poly_coefficients)
+    m = m_polystirene                                                                               # Relative refractive index, rounded to the 4th decimal value
 
-size_avg = _poly_fit(ref_index_Re)
+    diameters_Cext, m_Cext, lines_Cext, Cext = [], [], file.readlines(), []                         # The first row is taken apart since it contains
+    diameters_Cext.append(np.array([float(i) for i in lines_Cext[0].split('\t')[2:] if i.strip()])) # the particle diameters; the other ones are converted to float and 
+    diameters_Cext = diameters_Cext[0]                                                              # appended to the corresponding list
+    for x in lines_Cext[1:]: 
+        Cext.append(np.array([complex(i) for i in x.split('\t') if i.strip()]))
+        h += 1
+    file.close()
 
-poly_fit = interp1d(uniform_filter1d(selected_Cext, size=int(size_avg)), diameters_Cext, kind='linear', fill_value='extrapolate') 
-selected_Cext = interp1d(diameters_Cext, selected_Cext, kind='linear', fill_value='extrapolate')
+    for j in range(0, len(Cext)): 
+        m_Cext.append(Cext[j][0])
+        Cext[j] = np.real(Cext[j][1:]).astype(np.float32, copy=False)                              # Single precision is enough for smoothing, interpolation and plotting
 
-true_pos = np.array([1.0, 1.8, 2.9, 3.7, 5, 10])
-false_pos = np.array([1.05, 2.5, 3.7, 4.1, 5.8, 10])
-false_pos_dev = np.array([0.1, 0.3, 0.2, 0.3, 0.3, 0.2])
-false_pos_lower, false_pos_upper = false_pos-1.2*false_pos_dev, false_pos+1.2*false_pos_dev
-selected_Cext_interp = interp1d(poly_fit(selected_Cext(diameters_Cext)), selected_Cext(diameters_Cext), kind='linear', fill_value='extrapolate')
+    diameters_idx = []
+    for i in range(0, len(sizes)): diameters_idx.append(np.where(diameters_Cext==round(sizes[i], 2))[0][0])
 
-sigma = np.array([0.01, 0.01, 0.01, 0.01, 0.01, 0.01])
-p1, _ = curve_fit(f, false_pos, selected_Cext_interp(true_pos), (0, 0, 0, 0, 0), sigma=sigma)
-
-cal_curve = f(diameters_Cext, *p1)
-
-for k in range(0, 2):
-
-    x_plot = diameters_Cext[90:np.where(diameters_Cext>=10)[0][0]]
-
-    f, ax = plt.subplots(1, 1, figsize=(9, 6))
-    ax.set_ylabel('C$_{ext}$ [$\mathrm{\mu}$m$^2$]', fontsize=20)
-    ax.set_xlabel('$d$ [$\mathrm{\mu}$m]', fontsize=20)
-    ax.tick_params(axis='both', which='major', labelsize=20)
-    ax.semilogx(x_plot, selected_Cext(x_plot), linewidth=2, color='darkblue', label='Mie')
-    ax.semilogx(poly_fit(selected_Cext(diameters_Cext[110:1000])), selected_Cext(diameters_Cext[110:1000]), 'springgreen', linewidth=2,  label='Mie (smoothed)')
-    ax.semilogx(x_plot, cal_curve[90:np.where(diameters_Cext>=10)[0][0]], 'r--', linewidth=2, label='calibration curve')
-    ax.scatter(true_pos[:-1], selected_Cext_interp(true_pos[:-1]), linewidth=2, marker='^', facecolor='None', edgecolor='b', s=150, label='expected')
-    ax.scatter(false_pos[:-1], selected_Cext_interp(true_pos[:-1]), linewidth=2, marker='o', facecolor='w', edgecolor='r', s=150, label='measured')
-    for kk in range(0, len(false_pos)): ax.semilogx([false_pos_lower[kk], false_pos_upper[kk]], [selected_Cext_interp(true_pos[kk]), selected_Cext_interp(true_pos[kk])], 'r', linewidth=1.5)
-    ax.legend(loc='best', ncol=2, prop={'size': 14})
-    if k==0: ax.set_xscale('log'); ax.set_yscale('log')
-    elif k==1: ax.set_xscale('log'); ax.set_yscale('linear')
-    f.tight_layout()
-
-plt.show()
-
-current_directory = os.path.abspath(os.path.realpath(__file__))[2:-22].replace('\\', '/')
-file = open(current_directory+'_calibration/calibration_curve.txt', 'w')                    # Save data on .txt file for future analyses
-for i in range(0, len(x_plot)):
-    file.write('{:.02f}'.format(x_plot[i])+'\t'+'{:.04f}'.format((cal_curve[90:np.where(diameters_Cext>=10)[0][0]])[i])+'\n')  
-file.close()
+    polystirene_idx = np.where(np.real(m_Cext)==m_polystirene.real)[0]                              # Find when the row corresponding to polystirene refractive index 
+    Cext_polystirene = Cext[polystirene_idx[0]]
+    _Cext_polystirene = uniform_filter1d(Cext_polystirene, size=150)
+    Cext_polystirene_cfr = _Cext_polystirene[diameters_idx]
+
+    idx = np.where(np.real(m_Cext)==m.real)[0]                                                      # Find when the experimental refractive index is equal to some 
+    if len(idx) > 1:                                                                                # value ammong the LUT ones
+        selected_Cext = 0                                                                           # If more than one is found, the average Cext is computed
+        for i in range(0, len(idx)): selected_Cext += Cext[idx[i]]  
+        selected_Cext = selected_Cext/len(idx)
+    else: 
+        selected_Cext = Cext[idx[0]]
+    idx = 0
+
+    poly_coefficients = np.polyfit(n_range, s_range, 3)
+    _poly_fit = np.poly1d(poly_coefficients)
+
+    size_avg = _poly_fit(ref_index_Re)
+
+    poly_fit = interp1d(uniform_filter1d(selected_Cext, size=int(size_avg)), diameters_Cext, kind='linear', fill_value='extrapolate') 
+    selected_Cext = interp1d(diameters_Cext, selected_Cext, kind='linear', fill_value='extrapolate')
+
+    selected_Cext_interp = interp1d(poly_fit(selected_Cext(diameters_Cext)), selected_Cext(diameters_Cext), kind='linear', fill_value='extrapolate')
+
+    p1, _ = curve_fit(f, false_pos, selected_Cext_interp(true_pos), (0, 0, 0, 0, 0), sigma=sigma, jac=jac)
+
+    cal_curve = f(diameters_Cext, *p1)
+
+    x_range = slice(90, np.where(diameters_Cext>=10)[0][0])                                         # Diameters range [~1, 10] um shown in the plots and saved on file
+
+    return diameters_Cext[x_range], cal_curve[x_range], diameters_Cext, selected_Cext, poly_fit, selected_Cext_interp
+
+
+############################################################################################################################################################
+# Plot the Mie extinction cross-section, its smoothed version and the calibration curve, both in log-log and in log-linear scale.
+
+def plot_calibration(x_plot, cal_curve, diameters_Cext, selected_Cext, poly_fit, selected_Cext_interp):
+
+    false_pos_Cext = selected_Cext_interp(true_pos)                                                 # Error bar segments, shape (N, 2, 2): one [lower, upper] pair per point
+    error_segments = np.stack([np.column_stack([false_pos_lower, false_pos_Cext]), np.column_stack([false_pos_upper, false_pos_Cext])], axis=1)
+
+    mie_y = selected_Cext(x_plot)                                                                   # Curves shared by both figures, evaluated only once
+    mie_smooth_y = selected_Cext(diameters_Cext[110:1000])
+    mie_smooth_x = poly_fit(mie_smooth_y)
+
+    for k in range(0, 2):
+
+        fig, ax = plt.subplots(1, 1, figsize=(9, 6))
+        ax.set_ylabel('C$_{ext}$ [$\mathrm{\mu}$m$^2$]', fontsize=20)
+        ax.set_xlabel('$d$ [$\mathrm{\mu}$m]', fontsize=20)
+        ax.tick_params(axis='both', which='major', labelsize=20)
+        ax.semilogx(x_plot, mie_y, linewidth=2, color='darkblue', label='Mie')
+        ax.semilogx(mie_smooth_x, mie_smooth_y, 'springgreen', linewidth=2,  label='Mie (smoothed)')
+        ax.semilogx(x_plot, cal_curve, 'r--', linewidth=2, label='calibration curve')
+        ax.scatter(true_pos[:-1], false_pos_Cext[:-1], linewidth=2, marker='^', facecolor='None', edgecolor='b', s=150, label='expected')
+        ax.scatter(false_pos[:-1], false_pos_Cext[:-1], linewidth=2, marker='o', facecolor='w', edgecolor='r', s=150, label='measured')
+        ax.add_collection(LineCollection(error_segments, colors='r', linewidths=1.5))              # Horizontal error bars drawn as a single artist
+        ax.legend(loc='best', ncol=2, prop={'size': 14})
+        if k==0: ax.set_xscale('log'); ax.set_yscale('log')
+        elif k==1: ax.set_xscale('log'); ax.set_yscale('linear')
+        fig.tight_layout()
+
+    plt.show()
+
+
+############################################################################################################################################################
+# Save the calibration curve on a text file for future analyses.
+
+def save_calibration_curve(x_plot, cal_curve):
+
+    np.savetxt(_PATH / '_calibration' / 'calibration_curve.txt', np.column_stack([x_plot, cal_curve]), fmt=['%.2f', '%.4f'], delimiter='\t')
+
+
+############################################################################################################################################################
+############################################################################################################################################################
+
+
+if __name__ == '__main__':
+
+    wavelength = 0.670
+    ref_index_Re = 1.58                                                                             # Set the refractive index real and imaginary part 
+    ref_index_Im = 0
+    n_med = 1.3310
+
+    x_plot, cal_curve, diameters_Cext, selected_Cext, poly_fit, selected_Cext_interp = build_calibration_curve(wavelength, n_med, ref_index_Re, ref_index_Im)
+    plot_calibration(x_plot, cal_curve, diameters_Cext, selected_Cext, poly_fit, selected_Cext_interp)
+    save_calibration_curve(x_plot, cal_curve)
 
 
 ############################################################################################################################################################
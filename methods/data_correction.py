@@ -26,19 +26,91 @@
 ############################################################################################################################################################
 
 
-import os, pyqtgraph as pg, math as m, numpy as np, time, sys                                           # Import required libraries
+import os, pyqtgraph as pg, math as m, numpy as np, time, sys, hashlib, zipfile                              # Import required libraries
+from collections import OrderedDict
 from scipy.optimize import curve_fit
 from datetime import datetime
-from scipy.ndimage import uniform_filter1d
 from scipy.interpolate import interp1d
 from PyQt5.QtCore import *
 from PyQt5 import QtCore, QtWidgets, uic
 from PyQt5.QtGui import *
 from PyQt5.QtWidgets import *
 from qtwidgets import *
+try: from numba import njit
+except ImportError:                                                                                     # Numba is optional: without it the numeric kernels
+    def njit(*args, **kwargs): return lambda f: f                                                       # below run as plain Python/NumPy code
 
 _PATH = os.path.abspath(os.path.realpath(__file__))[2:-26].replace('\\', '/')
 
+_REF_INDEX_RE_ITEMS = ['1.5848']+['{:.4f}'.format(0.0001*i) for i in range(13311, 26000)]             # Real and imaginary parts of the refractive index
+_REF_INDEX_IM_ITEMS = ['{:.4f}'.format(0.1*i) for i in range(0, 11)]                                   # selectable by the user
+
+_SIZE_AVG_POLY = np.poly1d(np.polyfit(np.array([1.42, 1.46, 1.47, 1.48, 1.50, 1.51, 1.52, 1.53, 1.56, 1.58, 1.64]),     # Cubic fit of the Cext smoothing window
+                                      np.array([100, 125, 150, 150, 150, 150, 150, 125, 125, 100, 100]), 3))         # size vs the refractive index
+
+
+############################################################################################################################################################
+# Moving average of the given size, computed as the difference of a cumulative sum in a single pass. The edges are handled as in 'uniform_filter1d'
+# (mode='reflect', i.e. the input is mirrored about its first and last sample).
+
+def _box_filter(x, size):
+
+    left = size//2
+    cs = np.empty(len(x)+size)
+    cs[0] = 0.
+    np.cumsum(np.pad(x, (left, size-1-left), mode='symmetric'), out=cs[1:])
+
+    return (cs[size:]-cs[:-size])/size
+
+
+############################################################################################################################################################
+# Refractive index correction kernel: each channel extinction cross-section (clipped to 0.0001 um^2) is inverted on the smoothed Cext curve of the selected
+# refractive index by binary search and linear blend, with linear extrapolation outside the LUT range, as 'interp1d(..., fill_value='extrapolate')' does.
+# Non-positive diameters are set to 0.5 um. Clipping, search and blend run in a single loop, without intermediate arrays.
+
+@njit(cache=True, fastmath=True)
+def _ri_kernel(Cext_smooth, diameters, Cext_polystirene_cfr):
+
+    order = np.argsort(Cext_smooth, kind='mergesort')                                                   # The smoothed curve is not monotone: sort it as interp1d does
+    x, y = Cext_smooth[order], diameters[order]
+
+    sizes_RI = np.empty(len(Cext_polystirene_cfr))
+    for i in range(len(Cext_polystirene_cfr)):
+        c = max(Cext_polystirene_cfr[i], 0.0001)
+        j = min(max(np.searchsorted(x, c), 1), len(x)-1)
+        d = (y[j]-y[j-1])/(x[j]-x[j-1])*(c-x[j-1]) + y[j-1]
+        sizes_RI[i] = d if d > 0. else 0.5
+
+    return sizes_RI
+
+
+############################################################################################################################################################
+############################################################################################################################################################
+
+
+class Correction_worker(QObject):
+
+    finished = pyqtSignal(object)
+    failed = pyqtSignal(str)
+
+    # -----------------------------------------------------------------------------------------------------------------------------------------------------#
+    # Worker object running the refractive index correction outside the Qt main thread, so that the GUI keeps responding while the LUT is loaded and inverted.
+
+    def __init__(self, corrector, sizes):
+
+        super(Correction_worker, self).__init__()
+        self.corrector = corrector
+        self.sizes = sizes
+
+
+    def run(self):
+
+        try:
+            results = self.corrector.refractive_index_calibration_correction(self.sizes)
+            if results is not None: self.finished.emit(results)                                         # Nothing is returned if the correction has been stopped
+        except Exception as e: self.failed.emit(type(e).__name__+': '+str(e))                           # Errors (e.g. missing LUT, failed fit) are reported to the GUI
+        finally: QThread.currentThread().quit()                                                         # and the thread always ends, so that new corrections can start
+
 
 ############################################################################################################################################################
 ############################################################################################################################################################
@@ -46,6 +118,15 @@ _PATH = os.path.abspath(os.path.realpath(__file__))[2:-26].replace('\\', '/')
 
 class Data_corrector(QtWidgets.QMainWindow, object):
 
+    _LUT_cache = OrderedDict()                                                                          # Last parsed LUTs, keyed by (wavelength, medium refractive index, imaginary part)
+    _LUT_cache_size = 2
+    _result_cache = OrderedDict()                                                                       # Last corrections results, keyed by (wavelength, refractive index, sizes)
+    _result_cache_size = 32
+
+    progress = pyqtSignal(int)                                                                          # Progress of the correction (%), emitted by the worker thread
+    correction_finished = pyqtSignal(object)                                                            # Results of the refractive index correction
+    correction_failed = pyqtSignal(str)                                                                 # Error raised by the refractive index correction
+
     # -----------------------------------------------------------------------------------------------------------------------------------------------------#
     # Class constructor: creates a Data Corrector object
     
@@ -72,8 +153,13 @@ class Data_corrector(QtWidgets.QMainWindow, object):
         self.ref_index_correction_label = False
         self.aspect_ratio_correction_label = False
         self.run_correction_label = False
+        self._cancel = False                                                                            # Set by the 'Stop' button, checked by the running correction
 
         self.k = 2*m.pi/self.wavelength                                                                 # Wavenumber
+        self.n_med = 1.3310                                                                             # Set the water refractive index
+
+        self._lut_path_zero = _PATH+'/LUT_Cext/LUT_Cext_l='+'{:.02f}'.format(self.wavelength)+'um_nmed='+'{:.04f}'.format(self.n_med)+'_m=[1.0001-1.9534].txt'
+        self._lut_path_fmt = _PATH+'/LUT_Cext/LUT_Cext_l='+'{:.02f}'.format(self.wavelength)+'um_nmed='+'{:.04f}'.format(self.n_med)+'_m=[1.0001+{im:.04f}j-1.9534+{im:.04f}j].txt'
 
         self.abakus_logo = QPixmap(_PATH+'_icon/abakus_pixmap.png')                                     # Abakus icon
 
@@ -99,8 +185,8 @@ class Data_corrector(QtWidgets.QMainWindow, object):
         self.combobox_ref_index_RE.view().setVerticalScrollBarPolicy(Qt.ScrollBarAlwaysOn)
         self.combobox_ref_index_IM.view().setVerticalScrollBarPolicy(Qt.ScrollBarAlwaysOn)
 
-        self.combobox_ref_index_RE.addItems(['1.5848']+['{:.4f}'.format(0.0001*i) for i in range(13311, 26000)]) 
-        self.combobox_ref_index_IM.addItems(['{:.4f}'.format(0.1*i) for i in range(0, 11)])             # Real and imaginary parts of the refractive index set by the user
+        self.combobox_ref_index_RE.addItems(_REF_INDEX_RE_ITEMS) 
+        self.combobox_ref_index_IM.addItems(_REF_INDEX_IM_ITEMS)                                        # Real and imaginary parts of the refractive index set by the user
         self.lineEdit_aspect_ratio.setText('1.0000')                                                    # Aspect ratio default value (spherical approximation)
 
         self.progressbar = QProgressBar(self.groupBox_data)                                             # Progress bar creation
@@ -111,6 +197,9 @@ class Data_corrector(QtWidgets.QMainWindow, object):
         self.progressbar.setFixedHeight(50)
         self.progressbar.setFixedWidth(250)
         self.progressbar.setTextVisible(True)
+        self.progress.connect(self.progressbar.setValue)
+
+        self.correction_thread = None
 
         self.label_ref_index.setText("Refractive index correction:"+" <b>OFF") 
         self.label_aspect_ratio.setText("Aspect-ratio correction  [0, 1]:"+" <b>OFF")
@@ -169,11 +258,32 @@ class Data_corrector(QtWidgets.QMainWindow, object):
         
     def on_stop_correction(self):
 
-        if self.btn_stop.isChecked(): self.run_correction_label = False
+        self._cancel = True                                                                             # A running correction stops at its next check
         time.sleep(2)
         sys.exit()
 
 
+    # -----------------------------------------------------------------------------------------------------------------------------------------------------#
+    # Method to run the refractive index correction in a background thread. The refractive index set by the user is read here, in the main thread; the results
+    # are delivered through the 'correction_finished' signal.
+
+    def start_refractive_index_correction(self, sizes):
+
+        if self.correction_thread is not None and self.correction_thread.isRunning(): return            # A correction is already running
+
+        self.ref_index_Re = float(self.combobox_ref_index_RE.currentText())                             # Set the refractive index real and imaginary part 
+        self.ref_index_Im = float(self.combobox_ref_index_IM.currentText())
+        self._cancel = False
+
+        self.correction_thread = QThread()
+        self.correction_worker = Correction_worker(self, sizes)
+        self.correction_worker.moveToThread(self.correction_thread)
+        self.correction_thread.started.connect(self.correction_worker.run)
+        self.correction_worker.finished.connect(self.correction_finished)
+        self.correction_worker.failed.connect(self.correction_failed)
+        self.correction_thread.start()
+
+
     # -----------------------------------------------------------------------------------------------------------------------------------------------------#
     # This method defines the Abakus data correction and interpretation on the basis of any refractive index set by the user, different from the polystyrene one
     # with which the instrument is calibrated.
@@ -181,6 +291,7 @@ class Data_corrector(QtWidgets.QMainWindow, object):
     # from a LUT (look-up table). Particles diameters range from 0.2 um to 20 um.
     # According to the refractive index real and imaginary part set by the user, assuming that the particles are suspended in water with refractive index 1.3310 @ 670 nm, 
     # the corresponding extinction cross-section curve is selected from the LUT and used for data inversion.
+    # The refractive index (self.ref_index_Re, self.ref_index_Im) is set by 'start_refractive_index_correction', which runs this method in a worker thread.
         
     
     def refractive_index_calibration_correction(self, sizes):
@@ -189,88 +300,87 @@ class Data_corrector(QtWidgets.QMainWindow, object):
 
         t = datetime.now()
 
-        self.ref_index_Re = float(self.combobox_ref_index_RE.currentText())                                 # Set the refractive index real and imaginary part 
-        self.ref_index_Im = float(self.combobox_ref_index_IM.currentText())
-        self.n_med = 1.3310                                                                                 # Set the water refractive index
-        h = 0
-
-        if self.ref_index_Im != 0: file = open(_PATH+'/LUT_Cext/LUT_Cext_l='+'{:.02f}'.format(self.wavelength)+'um_nmed='+'{:.04f}'.format(self.n_med)+'_m=[1.0001+'+'{:.04f}'.format(self.ref_index_Im)+'j-1.9534+'+'{:.04f}'.format(self.ref_index_Im)+'j].txt', 'r')
-        else: file = open(_PATH+'/LUT_Cext/LUT_Cext_l='+'{:.02f}'.format(self.wavelength)+'um_nmed='+'{:.04f}'.format(self.n_med)+'_m=[1.0001-1.9534].txt', 'r')
+        result_key = (self.wavelength, self.ref_index_Re, self.ref_index_Im, sizes.shape, hashlib.blake2b(np.ascontiguousarray(sizes).tobytes(), digest_size=8).digest())
+        if result_key in Data_corrector._result_cache:                                                      # If the same correction has already been computed,
+            Data_corrector._result_cache.move_to_end(result_key)                                            # the previous results are returned
+            self.progress.emit(100)
+            self.sizes_RI, _, _, self.diameters_Cext, self.Cext_polystirene, self.selected_Cext, self.poly_fit = Data_corrector._result_cache[result_key]
+            return Data_corrector._result_cache[result_key]
 
+        self.progress.emit(0)
         self.m_polystirene = np.round(1.5848/self.n_med, 4)                                                 # Polystirene relative refractive index, rounded to the 4th decimal value
         
         self.m = np.round(self.ref_index_Re/self.n_med, 4)                                                  # Relative refractive index, rounded to the 4th decimal value
-        
-        self.diameters_Cext, self.m_Cext, lines_Cext, self.Cext = [], [], file.readlines(), []              # The first row is taken apart since it contains
-        self.diameters_Cext.append(np.array([float(i) for i in lines_Cext[0].split('\t')[2:] if i.strip()]))# the particle diameters; the other ones are converted to float and 
-        self.diameters_Cext = self.diameters_Cext[0]                                                        # appended to the corresponding list
-        for x in lines_Cext[1:]: 
-            if self.btn_stop.isChecked(): break
-            self.Cext.append(np.array([complex(i) for i in x.split('\t') if i.strip()]))
-            self.progressbar.setValue((h*100+1)/len(lines_Cext))
-            h += 1
-        
-        for j in range(0, len(self.Cext)): 
-            self.m_Cext.append(self.Cext[j][0])
-            self.Cext[j] = np.real(self.Cext[j][1:])
 
-        diameters_idx = []
-        for i in range(0, len(sizes)): diameters_idx.append(np.where(self.diameters_Cext==round(sizes[i]-0.70, 2))[0][0])
+        LUT_key = (self.wavelength, self.n_med, self.ref_index_Im)
+        if LUT_key in Data_corrector._LUT_cache:                                                            # If the LUT has already been parsed, it is taken from memory
+            Data_corrector._LUT_cache.move_to_end(LUT_key)
+            self.diameters_Cext, self.m_Cext, self.Cext = Data_corrector._LUT_cache[LUT_key]
+        else:
+            if self.ref_index_Im != 0: LUT_path = self._lut_path_fmt.format(im=self.ref_index_Im)
+            else: LUT_path = self._lut_path_zero
+            npy_path, axes_path = LUT_path[:-4]+'.npy', LUT_path[:-4]+'_axes.npz'
+
+            self.Cext = None
+            if all(os.path.isfile(p) and os.path.getmtime(p) >= os.path.getmtime(LUT_path) for p in (npy_path, axes_path)):
+                try:                                                                                        # If both binary copies of the LUT, newer than the text file,
+                    with np.load(axes_path) as axes:                                                        # are found, the cross-sections are memory-mapped from them
+                        self.diameters_Cext, self.m_Cext = axes['diameters'], axes['m']
+                    self.Cext = np.load(npy_path, mmap_mode='r')
+                    if self.Cext.shape != (len(self.m_Cext), len(self.diameters_Cext)): self.Cext = None
+                except (OSError, ValueError, KeyError, zipfile.BadZipFile): self.Cext = None                # Missing/corrupt copies: the text LUT is parsed again
+            if self.Cext is None:
+                file = open(LUT_path, 'r')
+                self.diameters_Cext = np.array([float(i) for i in file.readline().split('\t')[2:] if i.strip()])   # The first row is taken apart since it contains the particle diameters;
+                LUT = np.loadtxt(file, dtype=complex, delimiter='\t', usecols=range(0, len(self.diameters_Cext)+1))   # the other ones are parsed at once as complex values
+                file.close()
+
+                self.m_Cext = LUT[:, 0].real                                                                # First column: refractive index, then one row of extinction
+                self.Cext = np.ascontiguousarray(LUT[:, 1:].real, dtype=np.float32)                         # cross-sections per refractive index (single precision)
+
+                try:                                                                                        # The binary copy is written for the next runs (skipped if
+                    with open(npy_path+'.tmp', 'wb') as fh: np.save(fh, self.Cext)                          # the LUT folder is read-only): both files are written under a
+                    with open(axes_path+'.tmp', 'wb') as fh: np.savez(fh, diameters=self.diameters_Cext, m=self.m_Cext)
+                    os.replace(npy_path+'.tmp', npy_path)                                                   # temporary name and then renamed, so that a partial file is
+                    os.replace(axes_path+'.tmp', axes_path)                                                 # never loaded
+                except OSError: pass
+
+            Data_corrector._LUT_cache[LUT_key] = (self.diameters_Cext, self.m_Cext, self.Cext)
+            if len(Data_corrector._LUT_cache) > Data_corrector._LUT_cache_size: Data_corrector._LUT_cache.popitem(last=False)
+
+        self.progress.emit(40)                                                                              # LUT available
+        if self._cancel: return None                                                                        # Stop requested while the LUT was being loaded
 
         polystirene_idx = np.where(np.real(self.m_Cext)==self.m_polystirene.real)[0]                        # Find when the row corresponding to polystirene refractive index 
  
-        idx = np.where(np.real(self.m_Cext)==self.m.real)[0]                                                # Find when the experimental refractive index is equal to some 
-        if len(idx) > 1:                                                                                    # value ammong the LUT ones
-            self.selected_Cext = 0                                                                          # If more than one is found, the average Cext is computed
-            for i in range(0, len(idx)): 
-                if self.btn_stop.isChecked(): break
-                self.selected_Cext += self.Cext[idx[i]]  
-            self.selected_Cext = self.selected_Cext/len(idx)
-        else: 
-            self.selected_Cext = self.Cext[idx[0]]
-        idx = 0
-
-        self.selected_Cext_cfr = self.selected_Cext[diameters_idx]
-
-        self.n_range = np.array([1.42, 1.46, 1.47, 1.48, 1.50, 1.51, 1.52, 1.53, 1.56, 1.58, 1.64])
-        self.s_range = np.array([100, 125, 150, 150, 150, 150, 150, 125, 125, 100, 100])
-        self.poly_coefficients = np.polyfit(self.n_range, self.s_range, 3)
-        self._poly_fit = np.poly1d(self.poly_coefficients)
+        same_m = np.real(self.m_Cext)==self.m.real                                                          # Find when the experimental refractive index is equal to some 
+        if not same_m.any(): raise ValueError('refractive index '+'{:.4f}'.format(self.ref_index_Re)+' not found in the LUT')
+        self.selected_Cext = self.Cext[same_m].mean(axis=0)                                                 # value ammong the LUT ones: if more than one is found, the average Cext is computed
 
-        self.size_avg = self._poly_fit(1.58)
+        self.size_avg = _SIZE_AVG_POLY(1.58)
 
-        self.poly_fit = interp1d(uniform_filter1d(self.selected_Cext, size=int(self.size_avg)), self.diameters_Cext, kind='linear', fill_value='extrapolate') 
+        self.selected_Cext_smooth = _box_filter(self.selected_Cext, int(self.size_avg))
+        self.poly_fit = interp1d(self.selected_Cext_smooth, self.diameters_Cext, kind='linear', fill_value='extrapolate') 
 
         true_pos = np.array([1.0, 1.8, 2.9, 3.7, 5, 10])
         false_pos = np.array([1.05, 2.5, 3.7, 4.1, 5.8, 10])
         false_pos_dev = np.array([0.1, 0.3, 0.2, 0.3, 0.3, 0.2])
-        selected_Cext_interp = interp1d(self.poly_fit(self.selected_Cext), self.selected_Cext, kind='linear', fill_value='extrapolate')
+        selected_Cext_d = self.poly_fit(self.selected_Cext)                                                 # Extinction diameters of the LUT curve, sorted for np.interp
+        order = np.argsort(selected_Cext_d, kind='mergesort')                                               # (the expected diameters lie inside the LUT range)
 
         sigma = np.array([0.01, 0.01, 0.01, 0.01, 0.01, 0.01])
-        p1, _ = curve_fit(f, false_pos, selected_Cext_interp(true_pos), (0, 0, 0, 0, 0), sigma=sigma)
-
-        self.cal_curve = interp1d(self.diameters_Cext, f(self.diameters_Cext, *p1), kind='linear', fill_value='extrapolate')
-
-        self.Cext_polystirene = self.Cext[polystirene_idx[0]]
-        self.Cext_polystirene_cfr = self.cal_curve(sizes)
-        self.Cext_polystirene_cfr[self.Cext_polystirene_cfr<=0.0001] = 0.0001
-        self.sizes_RI_idx, self.sizes_RI = [], np.zeros(len(sizes))
-        self.interp_xaxis = np.arange(self.selected_Cext[0], self.selected_Cext[-1], 0.001)
-        for j in range(0, len(self.Cext_polystirene_cfr)):                                                  # Data correction
-            if self.btn_stop.isChecked(): break
-            idx = np.where(abs(self.interp_xaxis - self.Cext_polystirene_cfr[j]) < 0.001)[0]
-            if len(idx) > 1:
-                for i in range(0, len(idx)): 
-                    a = self.poly_fit(self.interp_xaxis[idx[i]])
-                    self.sizes_RI[j] += a
-                self.sizes_RI[j] = self.sizes_RI[j]/len(idx)
-            else: 
-                aa =  self.poly_fit(self.interp_xaxis[idx[0]])
-                self.sizes_RI[j] = aa
-
-        self.sizes_RI[self.sizes_RI<=0.] = 0.5
-
-        return self.sizes_RI, self.ref_index_Re, self.ref_index_Im, self.diameters_Cext, self.Cext_polystirene, self.selected_Cext, self.poly_fit
+        p1, _ = curve_fit(f, false_pos, np.interp(true_pos, selected_Cext_d[order], self.selected_Cext[order]), (0, 0, 0, 0, 0), sigma=sigma)
+        self.progress.emit(70)                                                                              # Calibration curve fitted
+
+        self.Cext_polystirene = self.Cext[polystirene_idx[0]]                                               # Row view of the cached LUT, not a copy
+        self.Cext_polystirene_cfr = np.interp(sizes, self.diameters_Cext, f(self.diameters_Cext, *p1))     # Calibration curve at the channels diameters
+        self.sizes_RI = _ri_kernel(self.selected_Cext_smooth, self.diameters_Cext, self.Cext_polystirene_cfr)  # Data correction: inversion of all the channels at once
+
+        Data_corrector._result_cache[result_key] = (self.sizes_RI, self.ref_index_Re, self.ref_index_Im, self.diameters_Cext, self.Cext_polystirene, self.selected_Cext, self.poly_fit)
+        if len(Data_corrector._result_cache) > Data_corrector._result_cache_size: Data_corrector._result_cache.popitem(last=False)
+        self.progress.emit(100)
+
+        return Data_corrector._result_cache[result_key]
 
 
     # -----------------------------------------------------------------------------------------------------------------------------------------------------#
@@ -35,7 +35,6 @@ class Error_Handling(QMainWindow, object):
         self.btn_width = 250
         self.window_height = 200
         self.window_width = 710
-        result = []
 
         super(Error_Handling, self).__init__()
         self.setWindowTitle("DEDALO Error handling window")
@@ -48,27 +47,28 @@ class Error_Handling(QMainWindow, object):
         self.centralbox = QGroupBox(self.widget)
         self.centralbox.setGeometry(QRect(0, 0, self.window_width, self.window_height))
 
-        file = open(_PATH+self.file, 'r')
-        lines = file.readlines()                                                                        # Open text file and read rows
-        for x in lines: result.append(x.split('\n'))                                                    # Split values according to the separator ','
+        file = open(_PATH+self.file, 'rb')                                                              # Open text file and read only its tail (last 8 kB),
+        file.seek(0, os.SEEK_END)                                                                       # which contains the last error traceback
+        file.seek(max(0, file.tell()-8192))
+        result = file.read().decode('utf-8', 'replace').splitlines()[-4:]                               # Split rows and keep the last four
         file.close()
         
         self.line1 = QLabel('<b>An error occurred! Help! Help!', self.centralbox)
         self.line1.move(30, 30)
         try:
-            self.line2 = QLabel(result[-4][0], self.centralbox)
+            self.line2 = QLabel(result[-4], self.centralbox)
             self.line2.move(30, 60)
         except: pass
         try:
-            self.line3 = QLabel(result[-3][0][2:], self.centralbox)
+            self.line3 = QLabel(result[-3][2:], self.centralbox)
             self.line3.move(30, 90)
         except: pass
         try:
-            self.line4 = QLabel(result[-2][0][4:], self.centralbox)
+            self.line4 = QLabel(result[-2][4:], self.centralbox)
             self.line4.move(30, 120)
         except: pass
         try:
-            self.line5 = QLabel(result[-1][0], self.centralbox)
+            self.line5 = QLabel(result[-1], self.centralbox)
             self.line5.setStyleSheet('QLabel { color: red; }')
             self.line5.move(30, 150)
         except: pass
@@ -78,11 +78,13 @@ class Error_Handling(QMainWindow, object):
 ############################################################################################################################################################
 
 
-app = QApplication(sys.argv)
-app.setStyle('Fusion')
-ex = Error_Handling(sys.argv[1])
-ex.show()
-sys.exit(app.exec_())
+if __name__ == '__main__':
+
+    app = QApplication(sys.argv)
+    app.setStyle('Fusion')
+    ex = Error_Handling(sys.argv[1])
+    ex.show()
+    sys.exit(app.exec_())
 
 
 ############################################################################################################################################################
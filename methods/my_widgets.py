@@ -22,7 +22,15 @@
 ############################################################################################################################################################
 
 
-import pyqtgraph as pg, numpy as np, os                                                                 # Import the required libraries
+import pyqtgraph as pg, numpy as np                                                                     # Import the required libraries
+from types import SimpleNamespace
+from pathlib import Path
+try:
+    from numba import njit
+    _HAVE_NUMBA = True
+except ImportError:                                                                                     # Numba is optional: without it the numeric kernels
+    def njit(*args, **kwargs): return lambda f: f                                                       # below run as plain Python/NumPy code
+    _HAVE_NUMBA = False
 from PyQt5 import QtWidgets, uic
 from PyQt5.QtWidgets import *
 from PyQt5.QtGui import QPixmap, QPainter
@@ -31,8 +39,130 @@ from PyQt5 import QtCore, QtWidgets, uic
 
 pg.setConfigOption('background', 'w')
 pg.setConfigOption('foreground', 'k')
+try:
+    import OpenGL                                                                                       # If PyOpenGL is available, the panel plots are drawn
+    _USE_OPENGL = True                                                                                  # on an OpenGL viewport (set per widget, not globally)
+except ImportError: _USE_OPENGL = False
 
-_PATH = os.path.abspath(os.path.realpath(__file__))[2:-21].replace('\\', '/')
+_PATH = Path(__file__).resolve().parents[1]                                                             # DEDALO root directory
+_UI_SCD = str(_PATH / 'subGUIs' / 'scd_panel.ui')                                                       # Absolute asset paths, resolved only once at import
+_UI_VOLT = str(_PATH / 'subGUIs' / 'volt_panel.ui')
+_ICONS = {name: str(_PATH / '_icon' / (name+'_pixmap.png')) for name in ('eurocold', 'unimib', 'disat')}
+
+_LOGOS = {}                                                                                             # Original and scaled logos, shared by all the panels
+
+_BRUSH_COUNTS = pg.mkBrush(50, 50, 255, 100)                                                            # Fill brushes of the size distribution, calibrated size
+_BRUSH_CAL = pg.mkBrush(0, 255, 0, 100)                                                                 # distribution and time distribution curves, shared by all
+_BRUSH_TIME = pg.mkBrush(255, 255, 0, 100)                                                              # the plots
+
+_PANEL_STYLE = ('QPushButton#btn_help { font: bold 12px; } '
+                'QPushButton#btn_update, QPushButton#btn_correct, QPushButton#btn_calibration, QPushButton#btn_voltage_noise, QPushButton#btn_serial { font: bold 11px; } '
+                'QGroupBox#acknowledgments, QGroupBox#groupBox { font: bold 11px; }')
+
+
+############################################################################################################################################################
+############################################################################################################################################################
+# Icons shown in the panels (EuroCold, University of Milano Bicocca and DISAT logos): they are loaded and scaled only once, when the first panel is created
+# (a QPixmap needs the QApplication to exist), and shared by all the panels.
+
+def _load_logos():
+
+    if not _LOGOS:
+        for name, size in (('eurocold', 172), ('unimib', 50), ('disat', 50)):
+            logo = QPixmap(_ICONS[name])
+            _LOGOS[name] = (logo, logo.scaled(size, size, Qt.KeepAspectRatio, transformMode = Qt.SmoothTransformation))
+
+    return _LOGOS
+
+
+############################################################################################################################################################
+############################################################################################################################################################
+# M4 downsampling of a time series with sorted x values: the x range is split into 'n_bins' equal bins (~ one per screen pixel) and for each bin only the
+# first, minimum, maximum and last points are kept, which is enough to draw exactly the same line at that resolution. The signature is given explicitly,
+# so the kernel is compiled at import and not at the first live-plot update.
+
+@njit('UniTuple(f8[:], 2)(f8[:], f8[:], i8)', cache=True)
+def m4_downsample(x, y, n_bins):
+
+    n = len(x)
+    if n_bins < 1 or n <= 4*n_bins: return x.copy(), y.copy()
+
+    first, last = np.full(n_bins, -1, np.int64), np.full(n_bins, -1, np.int64)
+    i_min, i_max = np.full(n_bins, -1, np.int64), np.full(n_bins, -1, np.int64)
+    dx = (x[n-1]-x[0])/n_bins
+    for i in range(n):
+        b = min(int((x[i]-x[0])/dx), n_bins-1) if dx > 0 else 0
+        if first[b] < 0: first[b], i_min[b], i_max[b] = i, i, i
+        elif y[i] < y[i_min[b]]: i_min[b] = i
+        elif y[i] > y[i_max[b]]: i_max[b] = i
+        last[b] = i
+
+    x_out, y_out, k = np.empty(4*n_bins), np.empty(4*n_bins), 0
+    for b in range(n_bins):
+        if first[b] < 0: continue
+        for j in (first[b], min(i_min[b], i_max[b]), max(i_min[b], i_max[b]), last[b]):         # Points are kept in x order
+            x_out[k], y_out[k] = x[j], y[j]
+            k += 1
+
+    return x_out[:k], y_out[:k]
+
+
+############################################################################################################################################################
+############################################################################################################################################################
+# Wrapper of a live-plot curve whose data only grow over time (time series): new samples are written into preallocated arrays, doubled when full, and the
+# curve is updated with views of the filled part, instead of converting the whole Python list to a new array at every acquisition.
+
+class AppendingCurve(object):
+
+    def __init__(self, item, prealloc=4096):
+
+        self.item = item                                                                                # Wrapped pyqtgraph PlotDataItem
+        self._buf_x = np.empty(prealloc)
+        self._buf_y = np.empty(prealloc)
+        self._n = 0
+        self._n_px = 0                                                                                  # Screen width used for M4 downsampling (0: disabled)
+
+
+    def __len__(self): return self._n
+
+
+    def append(self, x, y, **kargs):
+
+        x, y = np.atleast_1d(x), np.atleast_1d(y)
+        n = self._n+len(y)
+        if n > len(self._buf_x):                                                                        # Buffers full: their size is doubled
+            size = max(2*len(self._buf_x), n)
+            self._buf_x = np.concatenate((self._buf_x[:self._n], np.empty(size-self._n)))
+            self._buf_y = np.concatenate((self._buf_y[:self._n], np.empty(size-self._n)))
+        self._buf_x[self._n:n] = x
+        self._buf_y[self._n:n] = y
+        self._n = n
+
+        if self._n_px > 0: self.item.setData(*m4_downsample(self._buf_x[:n], self._buf_y[:n], self._n_px), **kargs)
+        else: self.item.setData(self._buf_x[:n], self._buf_y[:n], **kargs)
+
+
+    def set_downsampled(self, n_px):
+
+        self._n_px = int(n_px) if _HAVE_NUMBA else 0                                                    # Without numba the M4 loop costs more than drawing all the points
+
+
+    def clear(self):
+
+        self._n = 0
+        self.item.clear()
+
+
+############################################################################################################################################################
+# Curves are created only once per panel and reused at every new measurement/analysis: this function puts back into the plot the curves removed by
+# 'PlotItem.clear()' and empties them, so that repeated calls do not pile up new curves in the same plot.
+
+def _reuse_curves(plot, *curves):
+
+    for curve in curves:
+        item = curve.item if isinstance(curve, AppendingCurve) else curve
+        if item not in plot.listDataItems(): plot.addItem(item)
+        curve.clear()
 
 
 ############################################################################################################################################################
@@ -48,17 +178,18 @@ class First_Panel(QtWidgets.QWidget, object):
     def __init__(self, parent=None):
 
         super().__init__(parent)
-        uic.loadUi(_PATH+'subGUIs/scd_panel.ui', self)                                                  # Load the graphical interface
-
-        self.eurocold_logo = QPixmap(_PATH+'_icon/eurocold_pixmap.png')                                 # Load the icons (EuroCold logo, DISAT and
-        self.unimib_logo = QPixmap(_PATH+'_icon/unimib_pixmap.png')                                     # Unniversity of Milano Bicocca icon)
-        self.disat_logo = QPixmap(_PATH+'_icon/disat_pixmap.png')
+        uic.loadUi(_UI_SCD, self)                                                                       # Load the graphical interface
+        self.setUpdatesEnabled(False)                                                                   # No repaint until the whole panel has been built
 
-        self.lineEdit_software.setFixedWidth(100)
-        self.combobox_port.setFixedWidth(100)
+        logos = _load_logos()                                                                           # Load the icons (EuroCold logo, DISAT and
+        self.eurocold_logo, self._eurocold_scaled = logos['eurocold']                                   # Unniversity of Milano Bicocca icon)
+        self.unimib_logo, self._unimib_scaled = logos['unimib']
+        self.disat_logo, self._disat_scaled = logos['disat']
 
         self.first_window = pg.GraphicsLayoutWidget(self.scd_widget, show=True)                         # Define the environment for data visualization
+        if _USE_OPENGL: self.first_window.useOpenGL()                                                   # OpenGL viewport for this widget only
         self.first_window.resize(1170, 773)
+        self.first_window.scene().blockSignals(True)                                                    # Scene change notifications are collapsed into a single one
         pg.setConfigOptions(antialias=True)
 
         self.single_d_plt = self.first_window.addPlot(0, 0)                                             # First plot: size distribution second-by-second
@@ -66,23 +197,20 @@ class First_Panel(QtWidgets.QWidget, object):
         self.single_d_plt.setLabel('top', ' ')
         self.single_d_plt.setLabel('right', ' ')
         self.single_d_plt.setLabel('left', '# counts')
+        self.single_d_plt.setXRange(1.0, 10.3, padding=0)                                               # Fixed diameters range: no x bounds computation at each update
 
         self.time_plt = self.first_window.addPlot(1, 0)                                                 # Second plot: time evolution of the total number of particles
         self.time_plt.setLabel('bottom', 't [s]')                                                       # detected
         self.time_plt.setLabel('top', ' ')
         self.time_plt.setLabel('right', ' ')
         self.time_plt.setLabel('left', '# counts')
+        self.time_plt.disableAutoRange()                                                                # The time range is set by the caller, without scanning the curves
 
-        self.btn_help.setStyleSheet("QPushButton { font: bold 12px; }")
-        self.acknowledgments.setStyleSheet('QGroupBox { font: bold 11px; }')
-        self.groupBox.setStyleSheet('QGroupBox { font: bold 11px; }')
-        self.btn_update.setStyleSheet('QPushButton { font: bold 11px; }')
-        self.btn_correct.setStyleSheet('QPushButton { font: bold 11px; }')
-        self.btn_calibration.setStyleSheet('QPushButton { font: bold 11px; }')
-        self.btn_voltage_noise.setStyleSheet('QPushButton { font: bold 11px; }')
-        self.btn_serial.setStyleSheet('QPushButton { font: bold 11px; }')
+        self.first_window.scene().blockSignals(False)                                                   # Plots built: restore the scene signals
+        self.setStyleSheet(_PANEL_STYLE)                                                                # Buttons and group boxes style, parsed once
         
         self.show()
+        self.setUpdatesEnabled(True)                                                                    # Single repaint of the fully built panel
 
     
     # -----------------------------------------------------------------------------------------------------------------------------------------------------#
@@ -91,10 +219,11 @@ class First_Panel(QtWidgets.QWidget, object):
     def paintEvent(self, event):
 
         painter = QPainter(self)                                                                        # Set the environment for icon visualization
-        
-        painter.drawPixmap(QPoint(800,1000), self.unimib_logo.scaled(50, 50, Qt.KeepAspectRatio, transformMode = Qt.SmoothTransformation))
-        painter.drawPixmap(QPoint(600,1003), self.eurocold_logo.scaled(172, 172, Qt.KeepAspectRatio, transformMode = Qt.SmoothTransformation))
-        painter.drawPixmap(QPoint(520,1000), self.disat_logo.scaled(50, 50, Qt.KeepAspectRatio, transformMode = Qt.SmoothTransformation))
+        try:
+            painter.drawPixmap(QRect(QPoint(800,1000), self._unimib_scaled.size()), self._unimib_scaled)   # Target rectangles as large as the pre-scaled
+            painter.drawPixmap(QRect(QPoint(600,1003), self._eurocold_scaled.size()), self._eurocold_scaled)   # icons: plain blits, no further scaling
+            painter.drawPixmap(QRect(QPoint(520,1000), self._disat_scaled.size()), self._disat_scaled)
+        finally: painter.end()
         
     
     # -----------------------------------------------------------------------------------------------------------------------------------------------------#
@@ -102,7 +231,20 @@ class First_Panel(QtWidgets.QWidget, object):
 
     def single_d_and_time_plot(self, color, color1, color2, time_color, time_color_avg, width, style, width1, style1, brush_levels):
 
-        return self.first_window, self.single_d_plt, self.single_d_plt.plot(pen=pg.mkPen(color, width=width, style=style), fillLevel=0, brush=(50,50,255,100)), self.single_d_plt.plot(pen=pg.mkPen(color1, width=width, style=style), fillLevel=0, brush=brush_levels), self.single_d_plt.plot(pen=pg.mkPen(color2, width=width, style=style), fillLevel=0, brush=(0, 255, 0, 100)), self.time_plt, self.time_plt.plot(pen=pg.mkPen(time_color, width=width, style=style), fillLevel=0, brush=(255,255,0,100)), self.time_plt.plot(pen=pg.mkPen(time_color_avg, width=width1, style=style1))
+        if not hasattr(self, '_curves'):
+            pen, pen1, pen2 = pg.mkPen(color, width=width, style=style), pg.mkPen(color1, width=width, style=style), pg.mkPen(color2, width=width, style=style)
+            time_pen, time_pen_avg, brush1 = pg.mkPen(time_color, width=width, style=style), pg.mkPen(time_color_avg, width=width1, style=style1), pg.mkBrush(brush_levels)
+
+            self._curves = SimpleNamespace(main=self.single_d_plt.plot(pen=pen, fillLevel=0, brush=_BRUSH_COUNTS), overlay=self.single_d_plt.plot(pen=pen1, fillLevel=0, brush=brush1), 
+                                           cal=self.single_d_plt.plot(pen=pen2, fillLevel=0, brush=_BRUSH_CAL), time=self.time_plt.plot(pen=time_pen, fillLevel=0, brush=_BRUSH_TIME), 
+                                           time_avg=self.time_plt.plot(pen=time_pen_avg))
+            self._curves.time.curve.setCacheMode(QGraphicsItem.DeviceCoordinateCache)                   # Time curves change rarely: their rendering is cached and
+            self._curves.time_avg.curve.setCacheMode(QGraphicsItem.DeviceCoordinateCache)               # not repainted when only the other curves are updated
+        else:
+            _reuse_curves(self.single_d_plt, self._curves.main, self._curves.overlay, self._curves.cal)
+            _reuse_curves(self.time_plt, self._curves.time, self._curves.time_avg)
+
+        return self.first_window, self.single_d_plt, self._curves.main, self._curves.overlay, self._curves.cal, self.time_plt, self._curves.time, self._curves.time_avg
 
     
     # -----------------------------------------------------------------------------------------------------------------------------------------------------#
@@ -110,7 +252,14 @@ class First_Panel(QtWidgets.QWidget, object):
 
     def single_d_and_time_liveplot(self, counts_color, time_color, width, style):
 
-        return self.first_window, self.single_d_plt, self.single_d_plt.plot(pen=pg.mkPen(counts_color, width=width, style=style), fillLevel=0, brush=(50,50,255,100)), self.time_plt, self.time_plt.plot(pen=pg.mkPen(time_color, width=width, style=style), fillLevel=0, brush=(255,255,0,100))
+        if not hasattr(self, '_live_curves'):
+            self._live_curves = SimpleNamespace(main=self.single_d_plt.plot(pen=pg.mkPen(counts_color, width=width, style=style), fillLevel=0, brush=_BRUSH_COUNTS), 
+                                                time=AppendingCurve(self.time_plt.plot(pen=pg.mkPen(time_color, width=width, style=style), fillLevel=0, brush=_BRUSH_TIME)))
+        else:
+            _reuse_curves(self.single_d_plt, self._live_curves.main)
+            _reuse_curves(self.time_plt, self._live_curves.time)
+
+        return self.first_window, self.single_d_plt, self._live_curves.main, self.time_plt, self._live_curves.time
 
 
 ############################################################################################################################################################
@@ -126,17 +275,18 @@ class Second_Panel(QtWidgets.QWidget):
     def __init__(self, parent=None):
 
         super().__init__(parent)
-        uic.loadUi(_PATH+'subGUIs/scd_panel.ui', self)                                                  # Load the graphical interface
-
-        self.eurocold_logo = QPixmap(_PATH+'_icon/eurocold_pixmap.png')                                 # Load the icons (EuroCold logo, DISAT and
-        self.unimib_logo = QPixmap(_PATH+'_icon/unimib_pixmap.png')                                     # Unniversity of Milano Bicocca icon)
-        self.disat_logo = QPixmap(_PATH+'_icon/disat_pixmap.png')
+        uic.loadUi(_UI_SCD, self)                                                                       # Load the graphical interface
+        self.setUpdatesEnabled(False)                                                                   # No repaint until the whole panel has been built
 
-        self.lineEdit_software.setFixedWidth(100)
-        self.combobox_port.setFixedWidth(100)
+        logos = _load_logos()                                                                           # Load the icons (EuroCold logo, DISAT and
+        self.eurocold_logo, self._eurocold_scaled = logos['eurocold']                                   # Unniversity of Milano Bicocca icon)
+        self.unimib_logo, self._unimib_scaled = logos['unimib']
+        self.disat_logo, self._disat_scaled = logos['disat']
 
         self.second_window = pg.GraphicsLayoutWidget(self.scd_widget, show=True)                        # Define the environment for data visualization
+        if _USE_OPENGL: self.second_window.useOpenGL()                                                  # OpenGL viewport for this widget only
         self.second_window.resize(1170, 773)
+        self.second_window.scene().blockSignals(True)                                                   # Scene change notifications are collapsed into a single one
         pg.setConfigOptions(antialias=True)
         
         self.incremental_d_plt = self.second_window.addPlot(0, 0)                                       # First plot: incremental size distribution
@@ -144,23 +294,20 @@ class Second_Panel(QtWidgets.QWidget):
         self.incremental_d_plt.setLabel('top', ' ')
         self.incremental_d_plt.setLabel('right', ' ')
         self.incremental_d_plt.setLabel('left', '# counts')
+        self.incremental_d_plt.setXRange(1.0, 10.3, padding=0)                                          # Fixed diameters range: no x bounds computation at each update
         
         self.time_plt = self.second_window.addPlot(1, 0)                                                # Second plot: time evolution of the total number of particles
         self.time_plt.setLabel('bottom', 't [s]')                                                       # detected
         self.time_plt.setLabel('top', ' ')
         self.time_plt.setLabel('right', ' ')
         self.time_plt.setLabel('left', '# counts')
+        self.time_plt.disableAutoRange()                                                                # The time range is set by the caller, without scanning the curves
 
-        self.btn_help.setStyleSheet("QPushButton { font: bold 12px; }")
-        self.acknowledgments.setStyleSheet('QGroupBox { font: bold 11px; }')
-        self.groupBox.setStyleSheet('QGroupBox { font: bold 11px; }')
-        self.btn_update.setStyleSheet('QPushButton { font: bold 11px; }')
-        self.btn_correct.setStyleSheet('QPushButton { font: bold 11px; }')
-        self.btn_calibration.setStyleSheet('QPushButton { font: bold 11px; }')
-        self.btn_voltage_noise.setStyleSheet('QPushButton { font: bold 11px; }')
-        self.btn_serial.setStyleSheet('QPushButton { font: bold 11px; }')
+        self.second_window.scene().blockSignals(False)                                                  # Plots built: restore the scene signals
+        self.setStyleSheet(_PANEL_STYLE)                                                                # Buttons and group boxes style, parsed once
         
         self.show()
+        self.setUpdatesEnabled(True)                                                                    # Single repaint of the fully built panel
 
 
     # -----------------------------------------------------------------------------------------------------------------------------------------------------#
@@ -169,10 +316,11 @@ class Second_Panel(QtWidgets.QWidget):
     def paintEvent(self, event):
 
         painter = QPainter(self)                                                                        # Set the environment for icon visualization
-        
-        painter.drawPixmap(QPoint(800,1000), self.unimib_logo.scaled(50, 50, Qt.KeepAspectRatio, transformMode = Qt.SmoothTransformation))
-        painter.drawPixmap(QPoint(600,1003), self.eurocold_logo.scaled(172, 172, Qt.KeepAspectRatio, transformMode = Qt.SmoothTransformation))
-        painter.drawPixmap(QPoint(520,1000), self.disat_logo.scaled(50, 50, Qt.KeepAspectRatio, transformMode = Qt.SmoothTransformation))
+        try:
+            painter.drawPixmap(QRect(QPoint(800,1000), self._unimib_scaled.size()), self._unimib_scaled)   # Target rectangles as large as the pre-scaled
+            painter.drawPixmap(QRect(QPoint(600,1003), self._eurocold_scaled.size()), self._eurocold_scaled)   # icons: plain blits, no further scaling
+            painter.drawPixmap(QRect(QPoint(520,1000), self._disat_scaled.size()), self._disat_scaled)
+        finally: painter.end()
 
     
     # -----------------------------------------------------------------------------------------------------------------------------------------------------#
@@ -180,7 +328,21 @@ class Second_Panel(QtWidgets.QWidget):
 
     def incremental_d_and_time_plot(self, color, color1, color2, time_color, time_color_avg, width, style, width1, style1, brush_levels):
 
-        return self.second_window, self.incremental_d_plt, self.incremental_d_plt.plot(pen=pg.mkPen(color, width=width, style=style), fillLevel=0, brush=(50,50,255,100)), self.incremental_d_plt.plot(pen=pg.mkPen(color1, width=width, style=style), fillLevel=0, brush=brush_levels), self.incremental_d_plt.plot(pen=pg.mkPen(color2, width=width, style=style), fillLevel=0, brush=(0, 255, 0, 100)), self.time_plt, self.time_plt.plot(pen=pg.mkPen(time_color, width=width, style=style), fillLevel=0, brush=(255,255,0,100)), self.time_plt.plot(pen=pg.mkPen(time_color_avg, width=width1, style=style1))
+        if not hasattr(self, '_curves'):
+            pen, pen1, pen2 = pg.mkPen(color, width=width, style=style), pg.mkPen(color1, width=width, style=style), pg.mkPen(color2, width=width, style=style)
+            time_pen, time_pen_avg, brush1 = pg.mkPen(time_color, width=width, style=style), pg.mkPen(time_color_avg, width=width1, style=style1), pg.mkBrush(brush_levels)
+
+            self._curves = SimpleNamespace(main=self.incremental_d_plt.plot(pen=pen, fillLevel=0, brush=_BRUSH_COUNTS), overlay=self.incremental_d_plt.plot(pen=pen1, fillLevel=0, brush=brush1), 
+                                           cal=self.incremental_d_plt.plot(pen=pen2, fillLevel=0, brush=_BRUSH_CAL), time=self.time_plt.plot(pen=time_pen, fillLevel=0, brush=_BRUSH_TIME), 
+                                           time_avg=self.time_plt.plot(pen=time_pen_avg))
+            self._curves.main.curve.setCacheMode(QGraphicsItem.DeviceCoordinateCache)                   # Incremental and time curves change rarely: their rendering is
+            self._curves.time.curve.setCacheMode(QGraphicsItem.DeviceCoordinateCache)                   # cached and not repainted when only the other curves are updated
+            self._curves.time_avg.curve.setCacheMode(QGraphicsItem.DeviceCoordinateCache)
+        else:
+            _reuse_curves(self.incremental_d_plt, self._curves.main, self._curves.overlay, self._curves.cal)
+            _reuse_curves(self.time_plt, self._curves.time, self._curves.time_avg)
+
+        return self.second_window, self.incremental_d_plt, self._curves.main, self._curves.overlay, self._curves.cal, self.time_plt, self._curves.time, self._curves.time_avg
     
 
     # -----------------------------------------------------------------------------------------------------------------------------------------------------#
@@ -188,7 +350,14 @@ class Second_Panel(QtWidgets.QWidget):
 
     def incremental_d_and_time_liveplot(self, counts_color, time_color, width, style):
 
-        return self.second_window, self.incremental_d_plt, self.incremental_d_plt.plot(pen=pg.mkPen(counts_color, width=width, style=style), fillLevel=0, brush=(50,50,255,100)), self.time_plt, self.time_plt.plot(pen=pg.mkPen(time_color, width=width, style=style), fillLevel=0, brush=(255,255,0,100))
+        if not hasattr(self, '_live_curves'):
+            self._live_curves = SimpleNamespace(main=self.incremental_d_plt.plot(pen=pg.mkPen(counts_color, width=width, style=style), fillLevel=0, brush=_BRUSH_COUNTS), 
+                                                time=AppendingCurve(self.time_plt.plot(pen=pg.mkPen(time_color, width=width, style=style), fillLevel=0, brush=_BRUSH_TIME)))
+        else:
+            _reuse_curves(self.incremental_d_plt, self._live_curves.main)
+            _reuse_curves(self.time_plt, self._live_curves.time)
+
+        return self.second_window, self.incremental_d_plt, self._live_curves.main, self.time_plt, self._live_curves.time
 
 
 ############################################################################################################################################################
@@ -203,17 +372,18 @@ class Third_Panel(QtWidgets.QWidget):
     def __init__(self, parent=None):
 
         super().__init__(parent)
-        uic.loadUi(_PATH+'subGUIs/volt_panel.ui', self)                                                 # Load the graphical interface
-
-        self.eurocold_logo = QPixmap(_PATH+'_icon/eurocold_pixmap.png')                                 # Load the icons (EuroCold logo, DISAT and
-        self.unimib_logo = QPixmap(_PATH+'_icon/unimib_pixmap.png')                                     # Unniversity of Milano Bicocca icon)
-        self.disat_logo = QPixmap(_PATH+'_icon/disat_pixmap.png')
+        uic.loadUi(_UI_VOLT, self)                                                                      # Load the graphical interface
+        self.setUpdatesEnabled(False)                                                                   # No repaint until the whole panel has been built
 
-        self.lineEdit_software.setFixedWidth(100)
-        self.combobox_port.setFixedWidth(100)
+        logos = _load_logos()                                                                           # Load the icons (EuroCold logo, DISAT and
+        self.eurocold_logo, self._eurocold_scaled = logos['eurocold']                                   # Unniversity of Milano Bicocca icon)
+        self.unimib_logo, self._unimib_scaled = logos['unimib']
+        self.disat_logo, self._disat_scaled = logos['disat']
 
         self.third_window = pg.GraphicsLayoutWidget(self.volt_widget, show=True)                        # Define the environment for data visualization
+        if _USE_OPENGL: self.third_window.useOpenGL()                                                   # OpenGL viewport for this widget only
         self.third_window.resize(1170, 773)
+        self.third_window.scene().blockSignals(True)                                                    # Scene change notifications are collapsed into a single one
         pg.setConfigOptions(antialias=True)
 
         self.volt_plt = self.third_window.addPlot()                                                     # Plot: voltages (laser-diode and RAM-buffer voltage)
@@ -221,16 +391,14 @@ class Third_Panel(QtWidgets.QWidget):
         self.volt_plt.setLabel('top', ' ')
         self.volt_plt.setLabel('right', ' ')
         self.volt_plt.setLabel('left', 'voltage [mV]')
+        self.volt_plt.disableAutoRange()                                                                # The time range is set by the caller, without scanning the curves
+        self.volt_plt.setYRange(0, 8000, padding=0)
 
-        self.btn_help.setStyleSheet("QPushButton { font: bold 12px; }")
-        self.acknowledgments.setStyleSheet('QGroupBox { font: bold 11px; }')
-        self.groupBox.setStyleSheet('QGroupBox { font: bold 11px; }')
-        self.btn_update.setStyleSheet('QPushButton { font: bold 11px; }')
-        self.btn_calibration.setStyleSheet('QPushButton { font: bold 11px; }')
-        self.btn_voltage_noise.setStyleSheet('QPushButton { font: bold 11px; }')
-        self.btn_serial.setStyleSheet('QPushButton { font: bold 11px; }')
+        self.third_window.scene().blockSignals(False)                                                   # Plots built: restore the scene signals
+        self.setStyleSheet(_PANEL_STYLE)                                                                # Buttons and group boxes style, parsed once
         
         self.show()
+        self.setUpdatesEnabled(True)                                                                    # Single repaint of the fully built panel
 
 
     # -----------------------------------------------------------------------------------------------------------------------------------------------------#
@@ -239,10 +407,11 @@ class Third_Panel(QtWidgets.QWidget):
     def paintEvent(self, event):
 
         painter = QPainter(self)                                                                        # Set the environment for icon visualization
-        
-        painter.drawPixmap(QPoint(800,1000), self.unimib_logo.scaled(50, 50, Qt.KeepAspectRatio, transformMode = Qt.SmoothTransformation))
-        painter.drawPixmap(QPoint(600,1003), self.eurocold_logo.scaled(172, 172, Qt.KeepAspectRatio, transformMode = Qt.SmoothTransformation))
-        painter.drawPixmap(QPoint(520,1000), self.disat_logo.scaled(50, 50, Qt.KeepAspectRatio, transformMode = Qt.SmoothTransformation))
+        try:
+            painter.drawPixmap(QRect(QPoint(800,1000), self._unimib_scaled.size()), self._unimib_scaled)   # Target rectangles as large as the pre-scaled
+            painter.drawPixmap(QRect(QPoint(600,1003), self._eurocold_scaled.size()), self._eurocold_scaled)   # icons: plain blits, no further scaling
+            painter.drawPixmap(QRect(QPoint(520,1000), self._disat_scaled.size()), self._disat_scaled)
+        finally: painter.end()
 
     
     # -----------------------------------------------------------------------------------------------------------------------------------------------------#
@@ -250,7 +419,14 @@ class Third_Panel(QtWidgets.QWidget):
 
     def volt_plot(self, color1, color2, width, style):
 
-        return self.third_window, self.volt_plt, self.volt_plt.plot(pen=pg.mkPen(color1, width=width, style=style)), self.volt_plt.plot(pen=pg.mkPen(color2, width=width, style=style))
+        if not hasattr(self, '_curves'):
+            self._curves = SimpleNamespace(volt=self.volt_plt.plot(pen=pg.mkPen(color1, width=width, style=style)), ram=self.volt_plt.plot(pen=pg.mkPen(color2, width=width, style=style)))
+            self._curves.volt.curve.setCacheMode(QGraphicsItem.DeviceCoordinateCache)                   # Voltages are set once per file: their rendering is cached
+            self._curves.ram.curve.setCacheMode(QGraphicsItem.DeviceCoordinateCache)
+        else:
+            _reuse_curves(self.volt_plt, self._curves.volt, self._curves.ram)
+
+        return self.third_window, self.volt_plt, self._curves.volt, self._curves.ram
     
 
     # -----------------------------------------------------------------------------------------------------------------------------------------------------#
@@ -258,7 +434,13 @@ class Third_Panel(QtWidgets.QWidget):
 
     def volt_liveplot(self, color1, color2, width, style):
 
-        return self.third_window, self.volt_plt, self.volt_plt.plot(pen=pg.mkPen(color1, width=width, style=style)), self.volt_plt.plot(pen=pg.mkPen(color2, width=width, style=style))
+        if not hasattr(self, '_live_curves'):
+            self._live_curves = SimpleNamespace(volt=AppendingCurve(self.volt_plt.plot(pen=pg.mkPen(color1, width=width, style=style))), 
+                                                ram=AppendingCurve(self.volt_plt.plot(pen=pg.mkPen(color2, width=width, style=style))))
+        else:
+            _reuse_curves(self.volt_plt, self._live_curves.volt, self._live_curves.ram)
+
+        return self.third_window, self.volt_plt, self._live_curves.volt, self._live_curves.ram
 
 
 ############################################################################################################################################################
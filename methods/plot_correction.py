@@ -32,12 +32,47 @@ from PyQt5.QtCore import *
 from PyQt5 import QtCore, QtWidgets
 from PyQt5.QtGui import *
 from PyQt5.QtWidgets import *
+try: from numba import njit
+except ImportError:                                                                                     # Numba is optional: without it the statistics kernel
+    def njit(*args, **kwargs): return lambda f: f                                                       # below runs as plain Python code
 
 pg.setConfigOption('background', 'w')                                                                   # Set the background color (white) and the text color (black)
 pg.setConfigOption('foreground', 'k')
 
 _PATH = os.path.abspath(os.path.realpath(__file__))[2:-26].replace('\\', '/')
 
+_LEGEND_TEXT = ('<span style="font-size:8pt"><b>Particles:</b>&nbsp; {} pts<br><b>Peak:</b>&nbsp; {} ± {} µm<br><b>M. avg:</b>&nbsp; {} ± {} µm<br>'
+                '<b>W. avg.:</b>&nbsp; {} ± {} µm<br><b>S.D.:</b>&nbsp; {} µm<br><b>1st qnt.:</b>&nbsp; {} µm<br><b>2nd qnt.:</b>&nbsp; {} µm<br>'
+                '<b>3rd qnt.:</b>&nbsp; {} µm</span>')                                                  # Statistics legend, set with a single document layout
+_LEGEND_HTML = _LEGEND_TEXT.format('{:.2e}', *['{:.2f}']*10)                                            # Number formats are part of the template: one format call
+_LEGEND_EMPTY = _LEGEND_TEXT.format('-.--e-', *['-.--']*10)
+
+
+############################################################################################################################################################
+# Legend text for the statistics of a size distribution (particles, peak, mean, weighted average, standard deviation and quartiles).
+
+def _legend_html(particles, peak, error, mean, mean_err, w_avg, w_err, sd, q1, q2, q3):
+
+    return _LEGEND_HTML.format(particles, peak, error, mean, mean_err, w_avg, w_err, sd, q1, q2, q3)
+
+
+############################################################################################################################################################
+# Sums of the diameters, of the counts, of the diameters weighted by the counts and of the squares of both, computed in a single pass over the selection.
+
+@njit(cache=True, fastmath=True)
+def _fused_stats(x, y):
+
+    sum_x, sum_y, sum_xy, sum_x2, sum_y2 = 0., 0., 0., 0., 0.
+    for k in range(len(x)):
+        xk, yk = x[k], y[k]
+        sum_x += xk
+        sum_y += yk
+        sum_xy += xk*yk
+        sum_x2 += xk*xk
+        sum_y2 += yk*yk
+
+    return sum_x, sum_y, sum_xy, sum_x2, sum_y2
+
 
 ############################################################################################################################################################
 ############################################################################################################################################################
@@ -72,6 +107,7 @@ class CData_Plotter(QtWidgets.QMainWindow, object):
         self.Cext_polystirene = Cext_polystirene                                                        # Theoretical extinction cross section from Mie scattering theory
         self.selected_Cext = selected_Cext
         self.poly_fit = poly_fit                                                                        # Polynomial fit coefficients for extinction cross section <-> diameter inversion
+        if isinstance(self.poly_fit, np.poly1d): self._poly_coeffs_asc = np.ascontiguousarray(self.poly_fit.coeffs[::-1])
         self.save_path = save_path                                                                      # Path where to save the results
         self.save_name = save_name                                                                      # Output file name
         self.correction_labels = labels_correct                                                         # Labels for size distribution correction,  referring both to extinction correction, 
@@ -83,22 +119,28 @@ class CData_Plotter(QtWidgets.QMainWindow, object):
         if os.path.isdir(self.save_path): print("")                                                     # If the path does not yet exists, it is created
         else: os.makedirs(self.save_path)
 
-        self.output_file = open(self.save_path+self.save_name+'_summary.txt', 'w')                      # Output file initialization
-        self.output_file.write('Raw d [$\mu$m]\t\tRI corrected d [$\mu$m]\t\tAR corrected d [$\mu$m]\t\t# counts\n')
-
-        self.y_data = y_data                                                                            # Number of counts for each Abakus channel (= particle diameter)
+        self.y_data = np.ascontiguousarray(y_data, dtype=np.uint32)                                     # Number of counts for each Abakus channel (= particle diameter)
         self.time_data = y_time_data
         self.time_xrange = np.linspace(0, len(self.time_data)-1, len(self.time_data))
         self.dataset = full_dataset
+        self._dataset_np = self.dataset.to_numpy()                                                      # Cumulative counts (time x channels) as a plain array
+        self._time_axis = np.arange(self.dataset.shape[0])                                              # Time axis [s] of the dataset rows, built only once
+        self.single_histogram = np.zeros(self.dataset.shape[1], dtype=self._dataset_np.dtype)          # Size distribution of the selected seconds, updated in place
 
         self.raw_x_data = self.x_data[0]
         self.RI_x_data = self.x_data[1]
         self.ar_x_data = self.x_data[2]
         self.error = self.raw_x_data[1] - self.raw_x_data[0]
+        self._RI_sorted = bool(np.all(np.diff(self.RI_x_data)>=0))                                      # The corrected diameters are not necessarily monotonic
+
+        self._cum_y = np.concatenate(([0], np.cumsum(self.y_data)))                                     # Prefix sums (with a leading zero) of the counts, of their
+        self._cum_y2 = np.concatenate(([0], np.cumsum(np.asarray(self.y_data, dtype=np.float64)**2)))   # squares and of the diameters, used for the statistics of
+        self._raw_cums = self.prefix_sums(self.raw_x_data)                                              # a contiguous selection without summing over it again
+        self._RI_cums = self.prefix_sums(self.RI_x_data)
 
-        if not all(self.diameters_Cext)==0:
-            self.start = np.where(self.diameters_Cext==self.raw_x_data[0])[0][0]
-            self.stop = np.where(self.diameters_Cext==self.raw_x_data[-1])[0][0]
+        if self.diameters_Cext.size and np.any(self.diameters_Cext):                                    # LUT diameters are sorted: binary search instead of float
+            self.start = np.searchsorted(self.diameters_Cext, self.raw_x_data[0])                       # equality scans (no crash on a missing exact match)
+            self.stop = np.searchsorted(self.diameters_Cext, self.raw_x_data[-1])
 
             self.diameters_Cext = self.diameters_Cext[self.start:self.stop]
             self.Cext_polystirene = self.Cext_polystirene[self.start:self.stop]
@@ -127,29 +169,17 @@ class CData_Plotter(QtWidgets.QMainWindow, object):
         self.RI_range = self.RI_lr.getRegion()
         self.RI_curve = self.RI_plt.plot(pen=pg.mkPen('r', width=self.linewidth, style=self.linestyle), fillLevel=0, brush=(255,100,0,100))
         self.RI_curve_upd = self.RI_plt.plot(pen=pg.mkPen('y', width=self.linewidth, style=self.linestyle), fillLevel=0, brush=(255,100,0,100))
-        self.RI_legend = QtWidgets.QTextBrowser(self.widget)
+        self.RI_legend = QtWidgets.QLabel(self.widget)                                                  # Plain rich-text label: no document model to re-layout
         self.RI_legend.setGeometry(QtCore.QRect(1700, 70, 150, 120))
-        self.RI_legend.setFontPointSize(8)
+        self.RI_legend.setTextFormat(QtCore.Qt.RichText)
+        self.RI_legend.setAlignment(QtCore.Qt.AlignTop | QtCore.Qt.AlignLeft)
+        self.RI_legend.setFrameStyle(QFrame.StyledPanel | QFrame.Sunken)
+        self.RI_legend.setMargin(4)
+        self.RI_legend.setStyleSheet("QLabel { background-color: white; }")
         if self.RI_correction==True:
             self.RI_curve.setData(self.RI_x_data[1:], self.y_data[1:], stepMode='right')
-            self.RI_legend.append('<b>Particles:</b>  '+'{:.2e}'.format(sum(self.y_data))+' pts')  
-            self.RI_legend.append('<b>Peak:</b>        '+'{:.02f}'.format(self.RI_x_data[np.where(self.y_data==np.amax(self.y_data))[0]][0])+' ± '+'{:.02f}'.format(self.error)+' µm')
-            self.RI_legend.append('<b>M. avg:</b>     '+'{:.02f}'.format(np.mean(self.RI_x_data))+' ± '+'{:.02f}'.format(self.error/np.sqrt(len(self.RI_x_data)))+' µm')
-            try: self.RI_legend.append('<b>W. avg.:</b>   '+'{:.02f}'.format(np.average(self.RI_x_data, weights=self.y_data))+' ± '+'{:.02f}'.format(self.error*np.sqrt(sum(self.y_data**2))/sum(self.y_data))+' µm')
-            except: self.RI_legend.append('<b>W. avg.:</b> nan')
-            self.RI_legend.append('<b>S.D.:</b>         '+'{:.02f}'.format(np.sqrt(np.var((self.RI_x_data))))+' µm')
-            self.RI_legend.append('<b>1st qnt.:</b>   '+'{:.02f}'.format(np.quantile(self.RI_x_data, 0.25))+' µm')
-            self.RI_legend.append('<b>2nd qnt.:</b>  '+'{:.02f}'.format(np.median(self.RI_x_data))+' µm')
-            self.RI_legend.append('<b>3rd qnt.:</b>   '+'{:.02f}'.format(np.quantile(self.RI_x_data, 0.75))+' µm')
-        else:
-            self.RI_legend.append('<b>Particles:</b>   '+'-.--e- pts')  
-            self.RI_legend.append('<b>Peak:</b>        '+' -.-- ± -.-- µm')
-            self.RI_legend.append('<b>M. avg:</b>     '+' -.-- ± -.-- µm')
-            self.RI_legend.append('<b>W. avg.:</b>   '+' -.-- ± -.-- µm')
-            self.RI_legend.append('<b>S.D.:</b>         '+' -.-- µm')
-            self.RI_legend.append('<b>1st qnt.:</b>   '+' -.-- µm')
-            self.RI_legend.append('<b>2nd qnt.:</b>  '+' -.-- µm')
-            self.RI_legend.append('<b>3rd qnt.:</b>   '+' -.-- µm')
+            self.RI_legend.setText(self.full_legend(self.RI_x_data, self._RI_cums))
+        else: self.RI_legend.setText(_LEGEND_EMPTY)
         
         self.cext_plt = self.cext_win.addPlot()
         self.cext_plt.setTitle('<b>Extinction cross-sections comparison')
@@ -159,6 +189,9 @@ class CData_Plotter(QtWidgets.QMainWindow, object):
         self.cext_curve = self.cext_plt.plot(pen=pg.mkPen('r', width=self.linewidth, style=self.linestyle))
         self.cext_polystirene_curve.setData(self.diameters_Cext, self.Cext_polystirene)
         self.cext_curve.setData(self.diameters_Cext, self.selected_Cext)
+        for curve in (self.cext_polystirene_curve, self.cext_curve):                                    # Dense curves on a sorted x axis: peak-preserving downsampling
+            curve.setDownsampling(auto=True, method='peak')                                             # to ~ the plot width and only the visible part is drawn
+            curve.setClipToView(True)
         legend_cext = pg.LegendItem((0,0), offset=(50,50))
         legend_cext.setParentItem(self.cext_plt.graphicsItem())
         legend_cext.addItem(self.cext_polystirene_curve, 'n = 1.5848')
@@ -172,7 +205,8 @@ class CData_Plotter(QtWidgets.QMainWindow, object):
         self.cext_inv_curve = self.cext_inv_plt.plot(pen=pg.mkPen('r', width=self.linewidth, style=self.linestyle))
         self.cext_inv_curve.setData(self.selected_Cext, self.diameters_Cext)
         self.fit_curve = self.cext_inv_plt.plot(pen=pg.mkPen('k', width=self.linewidth, style=self.linestyle))
-        self.fit_curve.setData(self.selected_Cext, self.poly_fit(self.selected_Cext))
+        if isinstance(self.poly_fit, np.poly1d): self.fit_curve.setData(self.selected_Cext, np.polynomial.polynomial.polyval(self.selected_Cext, self._poly_coeffs_asc))
+        else: self.fit_curve.setData(self.selected_Cext, self.poly_fit(self.selected_Cext))             # Interpolating inversion (refractive index correction)
         legend_cext = pg.LegendItem((0,0), offset=(50,50))
         legend_cext.setParentItem(self.cext_inv_plt.graphicsItem())
         legend_cext.addItem(self.cext_inv_curve, 'd vs σ ext')
@@ -193,18 +227,14 @@ class CData_Plotter(QtWidgets.QMainWindow, object):
         self.raw_curve = self.raw_plt.plot(pen=pg.mkPen('b', width=self.linewidth, style=self.linestyle), fillLevel=0, brush=(50,50,255,100))
         self.raw_curve_upd = self.raw_plt.plot(pen=pg.mkPen('#1f456e', width=self.linewidth, style=self.linestyle), fillLevel=0, brush='#82eefd')
         self.raw_curve.setData(self.raw_x_data[1:], self.y_data[1:], stepMode='right')
-        self.raw_legend = QtWidgets.QTextBrowser(self.widget)
+        self.raw_legend = QtWidgets.QLabel(self.widget)                                                 # Plain rich-text label: no document model to re-layout
         self.raw_legend.setGeometry(QtCore.QRect(750, 70, 150, 120))
-        self.raw_legend.setFontPointSize(8)
-        self.raw_legend.append('<b>Particles:</b>  '+'{:.2e}'.format(sum(self.y_data))+' pts')  
-        self.raw_legend.append('<b>Peak:</b>        '+'{:.02f}'.format(self.raw_x_data[np.where(self.y_data==np.amax(self.y_data))[0]][0])+' ± '+'{:.02f}'.format(self.error)+' µm')
-        self.raw_legend.append('<b>M. avg:</b>     '+'{:.02f}'.format(np.mean(self.raw_x_data))+' ± '+'{:.02f}'.format(self.error/np.sqrt(len(self.raw_x_data)))+' µm')
-        try: self.raw_legend.append('<b>W. avg.:</b>   '+'{:.02f}'.format(np.average(self.raw_x_data, weights=self.y_data))+' ± '+'{:.02f}'.format(self.error*np.sqrt(sum(self.y_data**2))/sum(self.y_data))+' µm')
-        except: self.raw_legend.append('W. avg.:</b> nan')
-        self.raw_legend.append('<b>S.D.:</b>         '+'{:.02f}'.format(np.sqrt(np.var((self.raw_x_data))))+' µm')
-        self.raw_legend.append('<b>1st qnt.:</b>   '+'{:.02f}'.format(np.quantile(self.raw_x_data, 0.25))+' µm')
-        self.raw_legend.append('<b>2nd qnt.:</b>  '+'{:.02f}'.format(np.median(self.raw_x_data))+' µm')
-        self.raw_legend.append('<b>3rd qnt.:</b>   '+'{:.02f}'.format(np.quantile(self.raw_x_data, 0.75))+' µm')
+        self.raw_legend.setTextFormat(QtCore.Qt.RichText)
+        self.raw_legend.setAlignment(QtCore.Qt.AlignTop | QtCore.Qt.AlignLeft)
+        self.raw_legend.setFrameStyle(QFrame.StyledPanel | QFrame.Sunken)
+        self.raw_legend.setMargin(4)
+        self.raw_legend.setStyleSheet("QLabel { background-color: white; }")
+        self.raw_legend.setText(self.full_legend(self.raw_x_data, self._raw_cums))
         
 
         self.time_win = pg.GraphicsLayoutWidget(self.widget, show=True)
@@ -220,9 +250,17 @@ class CData_Plotter(QtWidgets.QMainWindow, object):
         self.time_range = self.time_lr.getRegion()
         self.time_curve = self.time_plt.plot(pen=pg.mkPen('#ff7c2e', width=self.linewidth, style=self.linestyle), fillLevel=0, brush=(255,255,0,100))
         self.time_curve_upd = self.time_plt.plot(pen=pg.mkPen('r', width=self.linewidth, style=self.linestyle), fillLevel=0, brush=(255,255,0,100))
+        for curve in (self.time_curve, self.time_curve_upd):                                            # Step curves: plain subsampling, which keeps the steps sharp
+            curve.setDownsampling(auto=True, method='subsample')
+            curve.setClipToView(True)
         self.time_curve.setData(self.time_xrange, self.time_data, stepMode='right')
 
 
+        self._pending = QtCore.QTimer(self)                                                             # Requests of statistics update within 50 ms are collapsed
+        self._pending.setSingleShot(True)                                                               # into a single computation (e.g. bursts of region changes)
+        self._pending.setInterval(50)
+        self._pending.timeout.connect(self._do_update_plot)
+
         self.update_raw = QPushButton(self.widget)
         self.update_raw.setGeometry(QtCore.QRect(750, 13, 85, 25))
         self.update_raw.setText('Get stats')
@@ -241,108 +279,129 @@ class CData_Plotter(QtWidgets.QMainWindow, object):
         self.update_time.clicked.connect(self.update_time_plot)
         self.update_time.setStyleSheet("QPushButton { color: green; font: bold 11px; }")
 
-        for i in range(0, len(self.raw_x_data)): self.output_file.write('{:.02f}'.format(self.raw_x_data[i])+'\t\t\t'+'{:.02f}'.format(self.RI_x_data[i])+'\t\t\t\t'+'{:.02f}'.format(self.ar_x_data[i])+'\t\t\t\t'+str(self.y_data[i])+'\n')
+        with open(self.save_path+self.save_name+'_summary.txt', 'w') as output_file:                    # Output file: all the rows are formatted and written at once
+            output_file.write('Raw d [$\mu$m]\t\tRI corrected d [$\mu$m]\t\tAR corrected d [$\mu$m]\t\t# counts\n')
+            np.savetxt(output_file, np.column_stack([self.raw_x_data, self.RI_x_data, self.ar_x_data, self.y_data]), fmt='%.2f\t\t\t%.2f\t\t\t\t%.2f\t\t\t\t%d')
 
 
     # -----------------------------------------------------------------------------------------------------------------------------------------------------#
-    #
+    # Statistics update request: the actual computation starts when no other request arrives for 50 ms.
 
     def update_plot(self):
 
+        self._pending.start()
+
+
+    # -----------------------------------------------------------------------------------------------------------------------------------------------------#
+    #
+
+    def _do_update_plot(self):
+
         self.indexes = len(self.raw_x_data)
 
         self.new_raw_range = self.raw_lr.getRegion()
         self.new_RI_range = self.RI_lr.getRegion()
+        raw_changed = not np.allclose(self.new_raw_range, self.raw_range)                               # Tolerant comparison: the regions may be re-emitted with
+        RI_changed = not np.allclose(self.new_RI_range, self.RI_range)                                  # slightly different floats
+        if not (raw_changed or RI_changed): return                                                      # Nothing moved: no work at all
 
-        if self.new_raw_range!=self.raw_range: 
-            self.indexes = np.where((self.raw_x_data >= self.new_raw_range[0]) & (self.raw_x_data <= self.new_raw_range[1]))[0]
-            self.raw_lr.setRegion([self.new_raw_range[0], self.new_raw_range[1]])
+        if raw_changed: 
+            self.indexes = self.region_indexes(self.raw_x_data, self.new_raw_range, True)
             self.raw_curve_upd.setData(self.raw_x_data[self.indexes], self.y_data[self.indexes], stepMode='right')
-            self.raw_legend.clear()
-            self.raw_legend.append('Particles:  '+'{:.2e}'.format(sum(self.y_data[self.indexes]))+' pts')  
-            self.raw_legend.append('Peak:        '+'{:.02f}'.format(self.raw_x_data[np.where(self.y_data==np.amax(self.y_data[self.indexes]))[0]][0])+' ± '+'{:.02f}'.format(self.error)+' µm')
-            self.raw_legend.append('M. avg:     '+'{:.02f}'.format(np.mean(self.raw_x_data[self.indexes]))+' ± '+'{:.02f}'.format(self.error/np.sqrt(len(self.raw_x_data[self.indexes])))+' µm')
-            try: self.raw_legend.append('W. avg.:   '+'{:.02f}'.format(np.average(self.raw_x_data[self.indexes], weights=self.y_data[self.indexes]))+' ± '+'{:.02f}'.format(self.error*np.sqrt(sum(self.y_data[self.indexes]**2))/sum(self.y_data[self.indexes]))+' µm')
-            except: self.raw_legend.append('W. avg.: nan')
-            self.raw_legend.append('S.D.:         '+'{:.02f}'.format(np.sqrt(np.var((self.raw_x_data[self.indexes]))))+' µm')
-            self.raw_legend.append('1st qnt.:   '+'{:.02f}'.format(np.quantile(self.raw_x_data[self.indexes], 0.25))+' µm')
-            self.raw_legend.append('2nd qnt.:  '+'{:.02f}'.format(np.median(self.raw_x_data[self.indexes]))+' µm')
-            self.raw_legend.append('3rd qnt.:   '+'{:.02f}'.format(np.quantile(self.raw_x_data[self.indexes], 0.75))+' µm')
-
-        if self.new_RI_range!=self.RI_range: 
-            self.indexes = np.where((self.RI_x_data >= self.new_RI_range[0]) & (self.RI_x_data <= self.new_RI_range[1]))[0]
-            self.RI_lr.setRegion([self.new_RI_range[0], self.new_RI_range[1]])
+            self.raw_legend.setText(_legend_html(*self.selection_stats(self.raw_x_data, self._raw_cums, self.indexes)))
+
+        if RI_changed: 
+            self.indexes = self.region_indexes(self.RI_x_data, self.new_RI_range, self._RI_sorted)
             self.RI_curve_upd.setData(self.RI_x_data[self.indexes], self.y_data[self.indexes], stepMode='right')
-            self.RI_legend.clear()
-            self.RI_legend.append('Particles:  '+'{:.2e}'.format(sum(self.y_data[self.indexes]))+' pts')  
-            self.RI_legend.append('Peak:        '+'{:.02f}'.format(self.RI_x_data[np.where(self.y_data==np.amax(self.y_data[self.indexes]))[0]][0])+' ± '+'{:.02f}'.format(self.error)+' µm')
-            self.RI_legend.append('M. avg:     '+'{:.02f}'.format(np.mean(self.RI_x_data[self.indexes]))+' ± '+'{:.02f}'.format(self.error/np.sqrt(len(self.RI_x_data[self.indexes])))+' µm')
-            try: self.RI_legend.append('W. avg.:   '+'{:.02f}'.format(np.average(self.RI_x_data[self.indexes], weights=self.y_data[self.indexes]))+' ± '+'{:.02f}'.format(self.error*np.sqrt(sum(self.y_data[self.indexes]**2))/sum(self.y_data[self.indexes]))+' µm')
-            except: self.RI_legend.append('W. avg.: nan')
-            self.RI_legend.append('S.D.:         '+'{:.02f}'.format(np.sqrt(np.var((self.RI_x_data[self.indexes]))))+' µm')
-            self.RI_legend.append('1st qnt.:   '+'{:.02f}'.format(np.quantile(self.RI_x_data[self.indexes], 0.25))+' µm')
-            self.RI_legend.append('2nd qnt.:  '+'{:.02f}'.format(np.median(self.RI_x_data[self.indexes]))+' µm')
-            self.RI_legend.append('3rd qnt.:   '+'{:.02f}'.format(np.quantile(self.RI_x_data[self.indexes], 0.75))+' µm')
+            self.RI_legend.setText(_legend_html(*self.selection_stats(self.RI_x_data, self._RI_cums, self.indexes)))
 
         self.raw_range = self.raw_lr.getRegion()
         self.RI_range = self.RI_lr.getRegion()
 
     
+    # -----------------------------------------------------------------------------------------------------------------------------------------------------#
+    # Legend text for the whole size distribution.
+
+    def full_legend(self, x_data, cums):
+
+        return _legend_html(*self.selection_stats(x_data, cums, slice(0, len(x_data))))
+
+
+    # -----------------------------------------------------------------------------------------------------------------------------------------------------#
+    # Prefix sums (with a leading zero) of the diameters, of their squares and of the diameters weighted by the number of counts.
+
+    def prefix_sums(self, x_data):
+
+        x_data = np.asarray(x_data, dtype=np.float64)
+        return tuple(np.concatenate(([0], np.cumsum(v))) for v in (x_data, x_data**2, x_data*self.y_data))
+
+
+    # -----------------------------------------------------------------------------------------------------------------------------------------------------#
+    # Channels whose diameters fall inside the given region: on a sorted axis they are a contiguous range, found with two binary searches and returned
+    # as a slice (so that the selected data are views), otherwise they are the indexes of a boolean mask.
+
+    def region_indexes(self, x_data, region, is_sorted):
+
+        if is_sorted: return slice(int(np.searchsorted(x_data, region[0], side='left')), int(np.searchsorted(x_data, region[1], side='right')))
+        return np.where((x_data >= region[0]) & (x_data <= region[1]))[0]
+
+
+    # -----------------------------------------------------------------------------------------------------------------------------------------------------#
+    # Statistics of the selected diameters, in the order of the legend: number of particles, peak, mean, weighted average and their errors, standard 
+    # deviation and quartiles. For a contiguous range (slice) all the sums are differences of the prefix sums computed at start-up; a different
+    # distribution 'y_data' (selected seconds only) must be given with an array of indexes, so that its sums come from a single pass over the data.
+
+    def selection_stats(self, x_data, cums, indexes, y_data=None):
+
+        x, y = x_data[indexes], (self.y_data if y_data is None else y_data)[indexes]
+        n = len(x)
+        if isinstance(indexes, slice):
+            i0, i1 = indexes.start, indexes.stop
+            sum_x, sum_x2, sum_xy = (c[i1]-c[i0] for c in cums)
+            sum_y, sum_y2 = self._cum_y[i1]-self._cum_y[i0], self._cum_y2[i1]-self._cum_y2[i0]
+        else: sum_x, sum_y, sum_xy, sum_x2, sum_y2 = _fused_stats(x, np.asarray(y, dtype=np.float64))
+
+        mean = sum_x/n
+        sd = np.sqrt(max(sum_x2/n-mean**2, 0))
+        w_avg, w_err = (sum_xy/sum_y, self.error*np.sqrt(sum_y2)/sum_y) if sum_y!=0 else (np.nan, np.nan)
+        q1, q2, q3 = np.quantile(x, [0.25, 0.5, 0.75])                                                  # The three quartiles in a single call
+
+        return sum_y, x[np.argmax(y)], self.error, mean, self.error/np.sqrt(n), w_avg, w_err, sd, q1, q2, q3
+
+
+    # -----------------------------------------------------------------------------------------------------------------------------------------------------#
+    # Legend refresh for the size distribution 'hist' of the diameters 'x_data', with the same statistics as the region selection.
+
+    def refresh_legend(self, legend, x_data, hist):
+
+        legend.setText(_legend_html(*self.selection_stats(x_data, None, np.arange(len(x_data)), hist)))
+
+
     # -----------------------------------------------------------------------------------------------------------------------------------------------------#
     #
 
     def update_time_plot(self):
 
-        self.indexes = len(self.raw_x_data)-1
+        self.indexes = np.arange(len(self.raw_x_data))                                                  # All the channels, for the selected seconds only
 
         self.new_time_range = self.time_lr.getRegion()
 
         if self.new_time_range!=self.time_range:
-            self.time_indexes = np.where((np.linspace(0, self.dataset.shape[0]-1, self.dataset.shape[0]) >= self.new_time_range[0]) & (np.linspace(0, self.dataset.shape[0]-1, self.dataset.shape[0]) <= self.new_time_range[1]))[0]
-            self.time_lr.setRegion([self.new_time_range[0], self.new_time_range[1]])
-            if len(self.time_indexes)==1: self.single_histogram = np.array(self.dataset.loc[self.time_indexes[0]]) - np.array(self.dataset.loc[self.time_indexes[0]-1])
-            elif len(self.time_indexes)>1: 
-                self.single_histogram = np.array(self.dataset.loc[self.time_indexes[0]]) - np.array(self.dataset.loc[self.time_indexes[0]-1])
-                for kk in range(1, len(self.time_indexes)):
-                    self.single_histogram += np.array(self.dataset.loc[self.time_indexes[kk]]) - np.array(self.dataset.loc[self.time_indexes[kk]-1])
-        
-            self.raw_curve_upd.setData(self.raw_x_data[self.indexes], self.single_histogram[self.indexes], stepMode='right')
-            self.raw_legend.clear()
-            self.raw_legend.append('Particles:  '+'{:.2e}'.format(sum(self.single_histogram[self.indexes]))+' pts')  
-            self.raw_legend.append('Peak:        '+'{:.02f}'.format(self.raw_x_data[np.where(self.single_histogram==np.amax(self.single_histogram[self.indexes]))[0]][0])+' ± '+'{:.02f}'.format(self.error)+' µm')
-            self.raw_legend.append('M. avg:     '+'{:.02f}'.format(np.mean(self.raw_x_data[self.indexes]))+' ± '+'{:.02f}'.format(self.error/np.sqrt(len(self.raw_x_data[self.indexes])))+' µm')
-            try: self.raw_legend.append('W. avg.:   '+'{:.02f}'.format(np.average(self.raw_x_data[self.indexes], weights=self.single_histogram[self.indexes]))+' ± '+'{:.02f}'.format(self.error*np.sqrt(sum(self.single_histogram[self.indexes]**2))/sum(self.single_histogram[self.indexes]))+' µm')
-            except: self.raw_legend.append('W. avg.: nan')
-            self.raw_legend.append('S.D.:         '+'{:.02f}'.format(np.sqrt(np.var((self.raw_x_data[self.indexes]))))+' µm')
-            self.raw_legend.append('1st qnt.:   '+'{:.02f}'.format(np.quantile(self.raw_x_data[self.indexes], 0.25))+' µm')
-            self.raw_legend.append('2nd qnt.:  '+'{:.02f}'.format(np.median(self.raw_x_data[self.indexes]))+' µm')
-            self.raw_legend.append('3rd qnt.:   '+'{:.02f}'.format(np.quantile(self.raw_x_data[self.indexes], 0.75))+' µm')
-
-        
-            self.RI_curve_upd.setData(self.RI_x_data[self.indexes], self.single_histogram[self.indexes], stepMode='right')
-            self.RI_legend.clear()
-            self.RI_legend.append('Particles:  '+'{:.2e}'.format(sum(self.single_histogram[self.indexes]))+' pts')  
-            self.RI_legend.append('Peak:        '+'{:.02f}'.format(self.RI_x_data[np.where(self.single_histogram==np.amax(self.single_histogram[self.indexes]))[0]][0])+' ± '+'{:.02f}'.format(self.error)+' µm')
-            self.RI_legend.append('M. avg:     '+'{:.02f}'.format(np.mean(self.RI_x_data[self.indexes]))+' ± '+'{:.02f}'.format(self.error/np.sqrt(len(self.RI_x_data[self.indexes])))+' µm')
-            try: self.RI_legend.append('W. avg.:   '+'{:.02f}'.format(np.average(self.RI_x_data[self.indexes], weights=self.single_histogram[self.indexes]))+' ± '+'{:.02f}'.format(self.error*np.sqrt(sum(self.single_histogram[self.indexes]**2))/sum(self.single_histogram[self.indexes]))+' µm')
-            except: self.RI_legend.append('W. avg.: nan')
-            self.RI_legend.append('S.D.:         '+'{:.02f}'.format(np.sqrt(np.var((self.RI_x_data[self.indexes]))))+' µm')
-            self.RI_legend.append('1st qnt.:   '+'{:.02f}'.format(np.quantile(self.RI_x_data[self.indexes], 0.25))+' µm')
-            self.RI_legend.append('2nd qnt.:  '+'{:.02f}'.format(np.median(self.RI_x_data[self.indexes]))+' µm')
-            self.RI_legend.append('3rd qnt.:   '+'{:.02f}'.format(np.quantile(self.RI_x_data[self.indexes], 0.75))+' µm')
-
-        
-            self.ar_curve_upd.setData(self.ar_x_data[self.indexes], self.single_histogram[self.indexes], stepMode='right')
-            self.ar_legend.clear()
-            self.ar_legend.append('Particles:  '+'{:.2e}'.format(sum(self.single_histogram[self.indexes]))+' pts')  
-            self.ar_legend.append('Peak:        '+'{:.02f}'.format(self.ar_x_data[np.where(self.single_histogram==np.amax(self.single_histogram[self.indexes]))[0]][0])+' ± '+'{:.02f}'.format(self.error)+' µm')
-            self.ar_legend.append('M. avg:     '+'{:.02f}'.format(np.mean(self.ar_x_data[self.indexes]))+' ± '+'{:.02f}'.format(self.error/np.sqrt(len(self.ar_x_data[self.indexes])))+' µm')
-            try: self.ar_legend.append('W. avg.:   '+'{:.02f}'.format(np.average(self.ar_x_data[self.indexes], weights=self.single_histogram[self.indexes]))+' ± '+'{:.02f}'.format(self.error*np.sqrt(sum(self.single_histogram[self.indexes]**2))/sum(self.single_histogram[self.indexes]))+' µm')
-            except: self.ar_legend.append('W. avg.: nan')
-            self.ar_legend.append('S.D.:         '+'{:.02f}'.format(np.sqrt(np.var((self.ar_x_data[self.indexes]))))+' µm')
-            self.ar_legend.append('1st qnt.:   '+'{:.02f}'.format(np.quantile(self.ar_x_data[self.indexes], 0.25))+' µm')
-            self.ar_legend.append('2nd qnt.:  '+'{:.02f}'.format(np.median(self.ar_x_data[self.indexes]))+' µm')
-            self.ar_legend.append('3rd qnt.:   '+'{:.02f}'.format(np.quantile(self.ar_x_data[self.indexes], 0.75))+' µm')
+            lo, hi = max(int(np.ceil(self.new_time_range[0])), 0), int(np.floor(self.new_time_range[1]))  # Integer seconds inside the region: a view of the time axis
+            hi = min(hi, len(self._time_axis)-1)
+            if hi<lo:                                                                                   # Region entirely outside the acquisition: nothing to show
+                self.time_range = self.new_time_range
+                return
+            self.time_indexes = self._time_axis[lo:hi+1]
+            if len(self.time_indexes)>0:                                                                # The counts are cumulative, so the sum of the increments over
+                i0, i1 = self.time_indexes[0], self.time_indexes[-1]                                    # the selected seconds telescopes to the difference between
+                last, first = self._dataset_np[i1], self._dataset_np[max(i0-1, 0)]                      # the last row and the one before the first, written into
+                np.subtract(last, first, out=self.single_histogram)                                     # the preallocated histogram
+
+                hist = self.single_histogram[self.indexes]
+                for curve, legend, x_data in ((self.raw_curve_upd, self.raw_legend, self.raw_x_data), (self.RI_curve_upd, self.RI_legend, self.RI_x_data)):
+                    curve.setData(x_data[self.indexes], hist, stepMode='right')
+                    self.refresh_legend(legend, x_data[self.indexes], hist)
 
         self.time_range = self.time_lr.getRegion()
 
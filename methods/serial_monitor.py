@@ -15,8 +15,9 @@
 ############################################################################################################################################################
 
 
-import sys, serial, serial.tools.list_ports, os, time                                                   # Import the required libraries
-from PyQt5.QtCore import QTimer, QDateTime
+import sys, serial, serial.tools.list_ports, os, time, codecs                                           # Import the required libraries
+import serial.threaded
+from PyQt5.QtCore import QTimer
 from PyQt5 import QtCore, QtWidgets, uic
 from PyQt5.QtGui import *
 
@@ -25,12 +26,71 @@ from PyQt5.QtGui import *
 ############################################################################################################################################################
 
 
-class SerialMonitor(QtWidgets.QMainWindow, object):
+class RxSignals(QtCore.QObject):
+
+    line = QtCore.pyqtSignal(str)                                                                       # Line received by the background reader, delivered to the GUI thread
+
+
+############################################################################################################################################################
+
+
+class RxProto(serial.threaded.LineReader):
+
+    TERMINATOR = b'\n'
+    MAX_LINE = 4096                                                                                     # Longest frame kept waiting for its terminator
+
+    # -----------------------------------------------------------------------------------------------------------------------------------------------------#
+    # Innitialization of the line-based protocol run by the background reader thread, given the signals holder used to talk to the GUI.
+
+    def __init__(self, signals):
+
+        super(RxProto, self).__init__()
+        self.signals = signals
+        self._dec = codecs.getincrementaldecoder(self.ENCODING)(self.UNICODE_HANDLING)                  # Keeps multi-byte sequences split across two chunks
+
+
+    # -----------------------------------------------------------------------------------------------------------------------------------------------------#
+    # Method for splitting the received chunk in complete lines: the buffer is scanned with find() and the consumed prefix is deleted only once.
+
+    def data_received(self, data):
+
+        self.buffer.extend(data)
+        start, idx = 0, self.buffer.find(self.TERMINATOR)
+        while idx >= 0:
+            self.handle_packet(bytes(self.buffer[start:idx]))                                           # Decoded by LineReader and passed to handle_line()
+            start, idx = idx+len(self.TERMINATOR), self.buffer.find(self.TERMINATOR, idx+len(self.TERMINATOR))
+        del self.buffer[:start]
+        if len(self.buffer) > self.MAX_LINE:                                                            # Corrupted/unterminated frames are shown as they are
+            self.handle_packet(bytes(self.buffer), final=False)                                         # instead of growing the buffer indefinitely
+            del self.buffer[:]
+
+
+    # -----------------------------------------------------------------------------------------------------------------------------------------------------#
+    # Method for decoding a frame: an incomplete trailing character of a truncated frame is held by the decoder and completed by the next frame.
+
+    def handle_packet(self, packet, final=True):
+
+        self.handle_line(self._dec.decode(packet, final))
+
+
+    # -----------------------------------------------------------------------------------------------------------------------------------------------------#
+    # Method for handing each decoded line over to the GUI thread (queued connection, since it is emitted from the reader thread).
+
+    def handle_line(self, line):
+
+        self.signals.line.emit(line)
+
+
+############################################################################################################################################################
+############################################################################################################################################################
+
+
+class SerialMonitor(QtWidgets.QMainWindow):
 
     # -----------------------------------------------------------------------------------------------------------------------------------------------------#
     # Innitialization of the serial commmunication and the graphical user interface (GUI) of the serial terminal.
     
-    def __init__(self, serial_port, path, baudrate = 38400, bytesize = 8, parity = 'N', stopbits = 1, timeout = 0.1, debug = True):
+    def __init__(self, serial_port, path, baudrate = 38400, bytesize = 8, parity = 'N', stopbits = 1, timeout = None, debug = True):
         
         super(SerialMonitor, self).__init__()
         uic.loadUi(path+'/subGUIs/serial_monitor.ui', self)                                             # Graphical user interface loading
@@ -40,6 +100,10 @@ class SerialMonitor(QtWidgets.QMainWindow, object):
         self.debug = debug                                                                              # Debug option
         self._dev = serial.Serial(self.serial_port, baudrate, bytesize, parity, stopbits, timeout)      # Initializing the serial communication with the specificed serial
                                                                                                         # communication parameters: baudrate, timeout, parity, stopbits and bytesize
+                                                                                                        # (no timeout: reads only happen in the reader thread, which sleeps in
+                                                                                                        # the kernel until data arrives and is woken up by cancel_read() on close)
+        if hasattr(self._dev, 'set_buffer_size'):                                                       # Larger OS buffers (Windows only) to hold the bursts
+            self._dev.set_buffer_size(rx_size=262144, tx_size=65536)                                    # received while the GUI is busy
 
         self.btn_send.clicked.connect(self.on_send_clicked)                                             # If the "Send" button is clicked, the user-specificed serial 
                                                                                                         # command is sent
@@ -47,24 +111,33 @@ class SerialMonitor(QtWidgets.QMainWindow, object):
                                                                                                         # stops and the COM port is closed
         self.lineEdit_port.setText(self.serial_port)
 
-        self.output = QtWidgets.QTextBrowser(self.console)
+        self.output = QtWidgets.QPlainTextEdit(self.console)
+        self.output.setReadOnly(True)
+        self.output.setMaximumBlockCount(2000)                                                          # Bounded scrollback: the oldest lines are dropped
         self.output.setGeometry(QtCore.QRect(10, 20, 680, 545))
         self.output.setObjectName("output")                                                             # Defining the GUI output window
-        self.output.setStyleSheet("QTextBrowser { background: black; color: green; }")
+        self.output.setStyleSheet("QPlainTextEdit { background: black; color: green; }")
 
-        self.output.append("<b>Connected to "+self.serial_port+" serial port, Abakus laser sensor reading continuously.\n")
+        self.output.setFont(QFont('monospace', 10, QFont.Bold))                                         # Bold style set once: lines are appended as plain text
+        self.output.appendPlainText(f'Connected to {self.serial_port} serial port, Abakus laser sensor reading continuously.')
 
         self.btn_send.setStyleSheet("QPushButton { color: green; font: bold 11px; }")
         self.btn_close.setStyleSheet("QPushButton { color: red; font: bold 11px; }")
         self.groupBox.setStyleSheet("QGroupBox { font: bold 11px; }")
         self.console.setStyleSheet("QGroupBox { font: bold 11px; }")
 
-        self.timer = QTimer()                                                                           # Starting the continuous (passive) serial monitoring
+        self._ts_sec, self._ts_str = 0, ''                                                              # Cached 'hh:mm:ss' timestamp, recomputed once per second
+        self._pending = []                                                                              # Lines waiting to be shown, flushed at ~30 fps in a single append
+        self.flush_timer = QTimer()
+        self.flush_timer.timeout.connect(self.flushOutput)
+        self.flush_timer.start(32)
 
+        self._signals = RxSignals()                                                                     # Starting the continuous (passive) serial monitoring: the port
+        self._signals.line.connect(self.readData)                                                       # is read by a background thread and the received lines are
+        self._reader = serial.threaded.ReaderThread(self._dev, lambda: RxProto(self._signals))          # marshalled to the GUI through a Qt signal
+
+        self._reader.start()
         if self.btn_send.isChecked(): self.on_send_clicked()
-        else:
-            self.timer.timeout.connect(self.readData)
-            self.timer.start(1000)
 
         self.show()
  
@@ -74,8 +147,9 @@ class SerialMonitor(QtWidgets.QMainWindow, object):
 
     def on_send_clicked(self):
     
-        self.cmd = self.lineEdit_cmd.text()                                                             # Retrieving the serial command
-        self.output.append('<b>'+QDateTime.currentDateTime().toString('hh:mm:ss')+'\t'+' >>  '+self.cmd)
+        self.cmd = self.lineEdit_cmd.text().strip()                                                     # Retrieving the serial command
+        if not self.cmd: return
+        self._pending.append(f'{self._ts()}\t >>  {self.cmd}')
         self.sendData()                                                                                 # Sending the command to the Abakus laser sensor
 
 
@@ -84,24 +158,73 @@ class SerialMonitor(QtWidgets.QMainWindow, object):
 
     def sendData(self):
 
-        if self.cmd != "":                                                                              # If a commmand is sent by the user, it is appropriately
-            self._dev.write(b'U0003\n')                                                                 # encoded for serial commmunication
-            time.sleep(1)
-            answer = self._dev.readline().decode('utf-8')
+        if not self.cmd: return                                                                         # If a commmand is sent by the user, it is appropriately
+        self._dev.write(bytes(self.cmd, 'ascii', 'replace')+b'\n')                                      # encoded for serial commmunication: the answer is received
+                                                                                                        # by the background reader and shown as soon as it arrives
+
+
+    # -----------------------------------------------------------------------------------------------------------------------------------------------------#
+    # Method for returning the current 'hh:mm:ss' timestamp: it is formatted again only when the second rolls over.
+
+    def _ts(self):
 
-            self.output.append('<b>'+QDateTime.currentDateTime().toString('hh:mm:ss')+'\t <<  '+answer)
+        sec = int(time.time())
+        if sec != self._ts_sec: self._ts_sec, self._ts_str = sec, time.strftime('%H:%M:%S', time.localtime(sec))
+        return self._ts_str
 
 
     # -----------------------------------------------------------------------------------------------------------------------------------------------------#
-    # Method for reading the serial output from the Abakus laser sensor and visualize it in the GUI iutput window. This task is exectued each second.
+    # Method for queueing each line read from the Abakus laser sensor by the background reader thread: it is shown at the next flush of the output window.
 
-    def readData(self):
+    def readData(self, line):
 
-        try: 
-            answer = self._dev.readline().decode('utf-8')                                               # Print output on the serial mmonitor
-            self.output.append('<b>'+QDateTime.currentDateTime().toString('hh:mm:ss')+'\t<b> <<  '+answer)
-        
-        except: print('')
+        self._pending.append(f'{self._ts()}\t <<  {line}')
+
+
+    # -----------------------------------------------------------------------------------------------------------------------------------------------------#
+    # Method for visualizing in the GUI output window all the lines queued since the last flush, with a single append (one layout pass) every 32 ms.
+
+    def flushOutput(self):
+
+        if self._pending:
+            self.output.appendPlainText('\n'.join(self._pending))
+            self._pending.clear()
+
+
+    # -----------------------------------------------------------------------------------------------------------------------------------------------------#
+    # Output window refresh rate: 32 ms while the serial monitor is visible, once per second while it is hidden or minimized (the received lines keep
+    # being queued and are shown all together).
+
+    def set_flush_rate(self):
+
+        self.flush_timer.setInterval(32 if self.isVisible() and not self.isMinimized() else 1000)
+
+
+    # -----------------------------------------------------------------------------------------------------------------------------------------------------#
+    # Window shown: the 32 ms refresh is restored.
+
+    def showEvent(self, event):
+
+        super(SerialMonitor, self).showEvent(event)
+        self.set_flush_rate()
+
+
+    # -----------------------------------------------------------------------------------------------------------------------------------------------------#
+    # Window hidden: the refresh is slowed down to once per second.
+
+    def hideEvent(self, event):
+
+        super(SerialMonitor, self).hideEvent(event)
+        self.set_flush_rate()
+
+
+    # -----------------------------------------------------------------------------------------------------------------------------------------------------#
+    # Window minimized or restored: the refresh rate follows the new window state.
+
+    def changeEvent(self, event):
+
+        super(SerialMonitor, self).changeEvent(event)
+        if event.type() == QtCore.QEvent.WindowStateChange: self.set_flush_rate()
 
 
     # -----------------------------------------------------------------------------------------------------------------------------------------------------#
@@ -109,16 +232,21 @@ class SerialMonitor(QtWidgets.QMainWindow, object):
     
     def on_close_clicked(self):
 
-        self._dev.close()
+        self.flush_timer.stop()                                                                         # No more refreshes of the output window
+        self._reader.close()                                                                            # Stops (and joins) the reader thread, then closes the serial port
+        self._pending.clear()
+        self.close()
 
 
 ############################################################################################################################################################
 ############################################################################################################################################################
 
 
-app = QtWidgets.QApplication(sys.argv)                                                                  # Run the application
-window = SerialMonitor(sys.argv[1], sys.argv[2])                                                        # Definition of a 'SerialMonitor' object
-app.exec_()                                                                                             # Python script execution
+if __name__ == '__main__':
+
+    app = QtWidgets.QApplication(sys.argv)                                                              # Run the application
+    window = SerialMonitor(sys.argv[1], sys.argv[2])                                                    # Definition of a 'SerialMonitor' object
+    app.exec_()                                                                                         # Python script execution
 
 
 ############################################################################################################################################################